@@ -0,0 +1,114 @@
+# benchmarks/bench_charts.py
+"""
+Бенчмарк отрисовки графиков: время рендера и потребление памяти (RSS процесса отрисовки).
+Запуск из корня репозитория: python benchmarks/bench_charts.py
+Сеть и токен бота не нужны — история цены генерируется случайным блужданием.
+"""
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+os.environ.setdefault("GROUP_CHAT_ID", "-1")
+
+from charts import render_chart_png  # noqa: E402
+
+# Количество точек, которое CoinGecko отдаёт для каждого диапазона
+RANGE_POINTS = {"1d": 288, "7d": 169, "30d": 721}
+RUNS = 20
+
+
+def make_points(count: int):
+    price = 0.05
+    start = time.time() - count * 300
+    points = []
+    for i in range(count):
+        price *= 1 + random.gauss(0, 0.01)
+        points.append((start + i * 300, price))
+    return points
+
+
+def _max_rss_kb() -> int:
+    # На Linux ru_maxrss в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _proc_status_kb(field: str) -> int:
+    with open("/proc/self/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _render_rss(points, title, runs):
+    """
+    Выполняется в процессе пула. Возвращает (RSS до рендера, пиковый RSS во время рендеров) в КБ.
+    RSS учитывает и буферы изображений Pillow, которые не видит tracemalloc.
+    Пик сбрасывается перед рендером (Linux, /proc/self/clear_refs), чтобы не мерить импорт модулей;
+    без /proc остаётся только ru_maxrss за всё время жизни процесса.
+    """
+    render_chart_png(points, title)  # прогрев: шрифты и кодеки Pillow загружаются при первом рендере
+    try:
+        baseline = _proc_status_kb("VmRSS")
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        baseline = _max_rss_kb()
+        for _ in range(runs):
+            render_chart_png(points, title)
+        return baseline, _max_rss_kb()
+    for _ in range(runs):
+        render_chart_png(points, title)
+    return baseline, _proc_status_kb("VmHWM")
+
+
+def bench_inline(range_key: str, points):
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        png = render_chart_png(points, f"BENCH · {range_key}")
+        timings.append(time.perf_counter() - started)
+
+    # Память меряется в отдельном процессе, как в боте (рендер идёт в ProcessPoolExecutor)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        baseline, peak = pool.submit(_render_rss, points, f"BENCH · {range_key}", RUNS).result()
+
+    print(f"{range_key:>4}: {len(points):4d} точек, медиана {statistics.median(timings) * 1000:7.2f} мс, "
+          f"p95 {sorted(timings)[int(RUNS * 0.95) - 1] * 1000:7.2f} мс, "
+          f"пиковый RSS {peak / 1024:6.1f} МБ (+{(peak - baseline) / 1024:5.1f} МБ на отрисовку), "
+          f"PNG {len(png) / 1024:6.1f} КБ")
+
+
+def bench_pool(points):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        # Первый вызов включает запуск процесса
+        started = time.perf_counter()
+        pool.submit(render_chart_png, points, "BENCH").result()
+        cold = time.perf_counter() - started
+
+        timings = []
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            pool.submit(render_chart_png, points, "BENCH").result()
+            timings.append(time.perf_counter() - started)
+    print(f"пул процессов: холодный старт {cold * 1000:.2f} мс, "
+          f"медиана {statistics.median(timings) * 1000:.2f} мс (с передачей данных)")
+
+
+def main():
+    random.seed(42)
+    for range_key, count in RANGE_POINTS.items():
+        bench_inline(range_key, make_points(count))
+    bench_pool(make_points(RANGE_POINTS["30d"]))
+    print(f"максимальный RSS основного процесса: {_max_rss_kb() / 1024:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_templates.py
+"""
+Бенчмарк рендеринга сообщений: пропускная способность с кэшем подписей и без него.
+Запуск из корня репозитория: python benchmarks/bench_templates.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+os.environ.setdefault("GROUP_CHAT_ID", "-1")
+
+import templates  # noqa: E402
+from templates import PRICE_UP_RESPONSE_TEMPLATES, render_caption  # noqa: E402
+
+GROUPS = 10000
+LOCALE_SHARE_EN = 0.2  # доля групп с английской локалью
+CURRENT = {"usd": 0.0512, "eur": 0.0471, "rub": 4.8640}
+LAST = {"usd": 0.0500, "eur": 0.0460, "rub": 4.7500}
+
+
+def naive_caption(current, last):
+    """Прежний способ: строки курсов и шаблон собираются заново для каждой группы"""
+    lines = []
+    for c in ("usd", "eur", "rub"):
+        old, new = last[c], current[c]
+        pct = ((new - old) / old) * 100
+        sign = "+" if pct > 0 else ""
+        lines.append(f"{c.upper()}: {old:.4f} → {new:.4f} ({sign}{pct:.2f}%)")
+    return random.choice(PRICE_UP_RESPONSE_TEMPLATES).format(currency_lines="\n".join(lines))
+
+
+def report(name, count, elapsed):
+    print(f"{name:<38} {count:6d} сообщений за {elapsed * 1000:8.2f} мс — {count / elapsed:12,.0f} в секунду")
+
+
+def bench_broadcast():
+    locales = ["en" if random.random() < LOCALE_SHARE_EN else "ru" for _ in range(GROUPS)]
+
+    started = time.perf_counter()
+    for _ in locales:
+        naive_caption(CURRENT, LAST)
+    report("рассылка: без кэша", GROUPS, time.perf_counter() - started)
+
+    templates._caption_cache.clear()
+    templates._lines_cache.clear()
+    variants = {"ru": 0, "en": 1}
+    started = time.perf_counter()
+    for locale in locales:
+        render_caption("price_up", locale, CURRENT, LAST, variants[locale])
+    report("рассылка: кэш подписей", GROUPS, time.perf_counter() - started)
+
+
+def bench_price_burst():
+    started = time.perf_counter()
+    for _ in range(GROUPS):
+        render_caption("price", "ru", CURRENT)
+    report("поток /price: кэш подписей", GROUPS, time.perf_counter() - started)
+
+
+def bench_cold():
+    # Каждый снимок цен уникален — кэш не помогает, измеряется скорость самого рендера
+    snapshots = [{c: v * (1 + i * 1e-6) for c, v in CURRENT.items()} for i in range(GROUPS)]
+    started = time.perf_counter()
+    for snapshot in snapshots:
+        render_caption("price_up", "ru", snapshot, LAST, 0)
+    report("уникальные снимки (промах кэша)", GROUPS, time.perf_counter() - started)
+
+
+def main():
+    random.seed(42)
+    bench_broadcast()
+    bench_price_burst()
+    bench_cold()
+
+
+if __name__ == "__main__":
+    main()
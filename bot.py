@@ -4,9 +4,18 @@ import logging
 import sys
 from aiogram import Bot, Dispatcher
 from aiogram.filters import Command
-from config import BOT_TOKEN, CHECK_INTERVAL
-from handlers import private_message_handler, price_command_handler, set_threshold_handler, add_group_handler, remove_group_handler, list_groups_handler, add_admin_handler, remove_admin_handler
-from price_checker import price_monitor_loop
+from config import BOT_TOKEN, CHECK_INTERVAL, HANDLER_CONCURRENCY, PRICE_API_CONCURRENCY, FILE_OPS_CONCURRENCY, MAX_PENDING_UPDATES, DRAIN_TIMEOUT, HEALTH_PORT
+from concurrency import ConcurrencyGovernor, ResourceLimiter, RESOURCE_PRICE_API, RESOURCE_FILES
+from handlers import private_message_handler, price_command_handler, chart_command_handler, inline_query_handler, set_threshold_handler, set_urgent_threshold_handler, set_digest_handler, set_locale_handler, add_group_handler, remove_group_handler, list_groups_handler, add_admin_handler, remove_admin_handler, import_groups_handler, remove_groups_handler, export_groups_handler
+from price_checker import price_monitor_loop, price_cache_refresh_loop, stop_price_monitor
+from coin_index import coin_index_refresh_loop
+from charts import shutdown_chart_pool
+from chat_health import chat_health_sweep_loop
+from digest import digest_flush_loop
+from fx import fx_refresh_loop
+from state_snapshot import restore_snapshot, save_snapshot, snapshot_loop
+from http_client import close_session
+from health import PollingMonitor, start_health_server, loop_lag_probe, set_polling_status
 
 # Настройка логирования с более подробным форматом
 logging.basicConfig(
@@ -19,38 +28,102 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 bot = Bot(token=BOT_TOKEN)
+# Отмечаем успешные getUpdates для /readyz: polling может "работать", повторяя неудачные запросы
+bot.session.middleware(PollingMonitor())
 dp = Dispatcher()
 
+# Ограничиваем параллельную обработку обновлений: общий лимит и очередь для всех обновлений,
+# отдельные лимиты для обработчиков с флагом resource (API цен, запись файлов)
+governor = ConcurrencyGovernor(HANDLER_CONCURRENCY, MAX_PENDING_UPDATES)
+resource_limiter = ResourceLimiter({
+    RESOURCE_PRICE_API: PRICE_API_CONCURRENCY,
+    RESOURCE_FILES: FILE_OPS_CONCURRENCY
+})
+dp.update.outer_middleware(governor)
+dp.message.middleware(resource_limiter)
+dp.inline_query.middleware(resource_limiter)
+
 # Регистрируем обработчик команды /price
 logger.info("Регистрация обработчика команды /price")
-dp.message.register(price_command_handler, Command("price"))
+dp.message.register(price_command_handler, Command("price"), flags={"resource": RESOURCE_PRICE_API})
+dp.message.register(chart_command_handler, Command("chart"), flags={"resource": RESOURCE_PRICE_API})
 
 # Регистрируем обработчик ЛС
 logger.info("Регистрация обработчика личных сообщений")
-dp.message.register(private_message_handler, lambda message: message.chat.type == "private" and (not message.text or not message.text.startswith('/')))
+dp.message.register(private_message_handler, lambda message: message.chat.type == "private" and not (message.text or message.caption or "").startswith('/'))
 
 # Регистрируем обработчики новых команд
 logger.info("Регистрация обработчиков новых команд")
-dp.message.register(set_threshold_handler, Command("set_threshold"))
-dp.message.register(add_group_handler, Command("add_group"))
-dp.message.register(remove_group_handler, Command("remove_group"))
+dp.message.register(set_threshold_handler, Command("set_threshold"), flags={"resource": RESOURCE_FILES})
+dp.message.register(set_urgent_threshold_handler, Command("set_urgent_threshold"), flags={"resource": RESOURCE_FILES})
+dp.message.register(set_digest_handler, Command("set_digest"), flags={"resource": RESOURCE_FILES})
+dp.message.register(set_locale_handler, Command("set_locale"), flags={"resource": RESOURCE_FILES})
+dp.message.register(add_group_handler, Command("add_group"), flags={"resource": RESOURCE_FILES})
+dp.message.register(remove_group_handler, Command("remove_group"), flags={"resource": RESOURCE_FILES})
 dp.message.register(list_groups_handler, Command("list_groups"))
-dp.message.register(add_admin_handler, Command("add_admin"))
-dp.message.register(remove_admin_handler, Command("remove_admin"))
+dp.message.register(add_admin_handler, Command("add_admin"), flags={"resource": RESOURCE_FILES})
+dp.message.register(remove_admin_handler, Command("remove_admin"), flags={"resource": RESOURCE_FILES})
+dp.message.register(import_groups_handler, Command("import_groups"), flags={"resource": RESOURCE_FILES})
+dp.message.register(remove_groups_handler, Command("remove_groups"), flags={"resource": RESOURCE_FILES})
+dp.message.register(export_groups_handler, Command("export_groups"))
+
+# Регистрируем обработчик inline-запросов
+logger.info("Регистрация обработчика inline-запросов")
+dp.inline_query.register(inline_query_handler)
+
+
+@dp.startup()
+async def on_startup():
+    set_polling_status("running")
 
 
 @dp.shutdown()
 async def on_shutdown():
     logger.info("Бот останавливается...")
+    set_polling_status("stopped")
+    # Сессия бота ещё открыта: даём начатым обработчикам и проверке цены закончить отправку
+    await asyncio.gather(governor.drain(DRAIN_TIMEOUT), stop_price_monitor(DRAIN_TIMEOUT))
 
 
 async def main():
     logger.info("Инициализация бота...")
+
+    # Восстанавливаем кэши и накопленное состояние из снимка до запуска фоновых задач;
+    # повреждённый снимок не должен мешать запуску — в этом случае стартуем с пустым состоянием
+    try:
+        restore_snapshot()
+    except Exception as e:
+        logger.error("Ошибка при восстановлении снимка состояния, запуск с пустым состоянием: %s", e, exc_info=True)
     
     # Запускаем фоновую задачу мониторинга цен
     price_monitor_task = asyncio.create_task(price_monitor_loop(bot))
     logger.info("Фоновая задача мониторинга цен запущена")
 
+    # Запускаем периодическую проверку доступности групп
+    chat_sweep_task = asyncio.create_task(chat_health_sweep_loop(bot))
+    logger.info("Фоновая задача проверки групп запущена")
+
+    # Запускаем загрузку индекса монет и обновление кэша цен для inline-запросов
+    coin_index_task = asyncio.create_task(coin_index_refresh_loop())
+    price_cache_task = asyncio.create_task(price_cache_refresh_loop())
+    logger.info("Фоновые задачи inline-режима запущены")
+
+    # Запускаем обновление таблицы курсов валют
+    fx_task = asyncio.create_task(fx_refresh_loop())
+    logger.info("Фоновая задача обновления курсов валют запущена")
+
+    # Запускаем периодическое сохранение снимка состояния
+    snapshot_task = asyncio.create_task(snapshot_loop())
+    logger.info("Фоновая задача сохранения снимков запущена")
+
+    # Запускаем отправку сводок для групп в режиме сводки
+    digest_task = asyncio.create_task(digest_flush_loop(bot))
+    logger.info("Фоновая задача отправки сводок запущена")
+
+    # Запускаем сервер проверок /healthz и /readyz и измерение задержки цикла событий
+    lag_probe_task = asyncio.create_task(loop_lag_probe())
+    health_runner = await start_health_server() if HEALTH_PORT else None
+
     # Запускаем polling (при необходимости можно использовать webhook)
     try:
         logger.info("Бот запускается...")
@@ -61,12 +134,20 @@ async def main():
         raise
     finally:
         logger.info("Бот останавливается...")
-        # Отменяем фоновую задачу при завершении работы бота
-        price_monitor_task.cancel()
-        try:
-            await price_monitor_task
-        except asyncio.CancelledError:
-            pass  # Это ожидаемо при отмене задачи
+        set_polling_status("stopped")
+        if health_runner is not None:
+            await health_runner.cleanup()
+        # Отменяем фоновые задачи при завершении работы бота
+        for task in (price_monitor_task, chat_sweep_task, coin_index_task, price_cache_task, digest_task, fx_task, snapshot_task, lag_probe_task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass  # Это ожидаемо при отмене задачи
+        # Сохраняем снимок после остановки задач, чтобы он отражал последнее состояние
+        save_snapshot()
+        shutdown_chart_pool()
+        await close_session()
         await bot.session.close()
         logger.info("Бот успешно остановлен")
 
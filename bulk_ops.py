@@ -0,0 +1,234 @@
+# bulk_ops.py
+import csv
+import io
+import json
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_IMPORT_SIZE = 1024 * 1024  # максимальный размер загружаемого файла (1 МБ)
+
+ROW_GROUP = "group"
+ROW_ADMIN = "admin"
+
+# Статусы строк в отчёте
+STATUS_ADD = "add"          # будет добавлено
+STATUS_REMOVE = "remove"    # будет удалено
+STATUS_SKIP = "skip"        # ничего не меняется (уже есть / уже нет)
+STATUS_ERROR = "error"      # строка некорректна
+
+
+class BulkParseError(ValueError):
+    """Ошибка разбора файла или списка для пакетной операции"""
+
+
+def _row(line: int, kind: str, raw_id, name: Optional[str] = None) -> dict:
+    return {"line": line, "type": kind, "raw_id": raw_id, "name": name}
+
+
+def parse_text_rows(text: str) -> List[dict]:
+    """
+    Разбирает многострочный список вида "<id> <название>" (по одной группе в строке).
+    Пустые строки и строки, начинающиеся с #, пропускаются.
+    """
+    rows = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(maxsplit=1)
+        rows.append(_row(line_no, ROW_GROUP, parts[0], parts[1].strip() if len(parts) > 1 else None))
+    return rows
+
+
+def parse_json_rows(data: bytes) -> List[dict]:
+    """
+    Разбирает JSON: либо структуру как в groups.json ({"admin_ids": [...], "group_chats": [...]}),
+    либо список групп [{"id": ..., "name": ...}].
+    """
+    try:
+        payload = json.loads(data.decode("utf-8-sig"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise BulkParseError(f"некорректный JSON: {e}")
+
+    if isinstance(payload, list):
+        payload = {"group_chats": payload}
+    if not isinstance(payload, dict):
+        raise BulkParseError("ожидается объект или список групп")
+
+    group_chats = payload.get("group_chats", [])
+    admin_ids = payload.get("admin_ids", [])
+    if not isinstance(group_chats, list):
+        raise BulkParseError("поле group_chats должно быть списком")
+    if not isinstance(admin_ids, list):
+        raise BulkParseError("поле admin_ids должно быть списком")
+
+    rows = []
+    for i, group in enumerate(group_chats, start=1):
+        if isinstance(group, dict):
+            rows.append(_row(i, ROW_GROUP, group.get("id"), group.get("name")))
+        else:
+            rows.append(_row(i, ROW_GROUP, group))
+    for i, admin_id in enumerate(admin_ids, start=1):
+        rows.append(_row(i, ROW_ADMIN, admin_id))
+    return rows
+
+
+def parse_csv_rows(data: bytes) -> List[dict]:
+    """
+    Разбирает CSV с колонками id,name и необязательной колонкой type (group/admin).
+    Строка заголовка обязательна.
+    """
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise BulkParseError(f"некорректная кодировка CSV: {e}")
+
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or "id" not in reader.fieldnames:
+        raise BulkParseError("в CSV нет колонки id")
+
+    rows = []
+    for record in reader:
+        kind = (record.get("type") or ROW_GROUP).strip().lower()
+        name = (record.get("name") or "").strip() or None
+        # Номер строки файла с учётом заголовка
+        rows.append(_row(reader.line_num, kind, (record.get("id") or "").strip(), name))
+    return rows
+
+
+def parse_document(data: bytes, filename: str) -> List[dict]:
+    """Выбирает формат разбора по расширению файла"""
+    if len(data) > MAX_IMPORT_SIZE:
+        raise BulkParseError("файл слишком большой")
+    lower = (filename or "").lower()
+    if lower.endswith(".json"):
+        return parse_json_rows(data)
+    if lower.endswith(".csv"):
+        return parse_csv_rows(data)
+    if lower.endswith(".txt"):
+        return parse_text_rows(data.decode("utf-8-sig", errors="replace"))
+    raise BulkParseError("поддерживаются только файлы .json, .csv и .txt")
+
+
+def _parse_id(raw_id) -> Optional[int]:
+    """Принимает только целые числа и строки с целым числом; дробные ID не округляются"""
+    if isinstance(raw_id, bool):
+        return None
+    if isinstance(raw_id, int):
+        return raw_id
+    if isinstance(raw_id, float):
+        return int(raw_id) if raw_id.is_integer() else None
+    if isinstance(raw_id, str) and re.fullmatch(r"-?\d+", raw_id.strip()):
+        return int(raw_id)
+    return None
+
+
+def validate_rows(rows: List[dict], groups: dict, remove: bool = False) -> Tuple[List[dict], bool]:
+    """
+    Проверяет все строки до применения изменений.
+    Возвращает список строк с полями status/id/reason и признак наличия ошибок.
+    """
+    existing_groups = {group["id"] for group in groups.get("group_chats", [])}
+    existing_admins = set(groups.get("admin_ids", []))
+    seen = set()
+    has_errors = False
+
+    for row in rows:
+        chat_id = _parse_id(row["raw_id"])
+        row["id"] = chat_id
+        if row["type"] not in (ROW_GROUP, ROW_ADMIN):
+            row["status"], row["reason"] = STATUS_ERROR, f"неизвестный тип '{row['type']}'"
+        elif chat_id is None:
+            row["status"], row["reason"] = STATUS_ERROR, "неверный формат ID"
+        elif row["type"] == ROW_GROUP and chat_id >= 0:
+            row["status"], row["reason"] = STATUS_ERROR, "ID группы должен быть отрицательным"
+        elif row["type"] == ROW_ADMIN and chat_id <= 0:
+            row["status"], row["reason"] = STATUS_ERROR, "ID пользователя должен быть положительным"
+        elif (row["type"], chat_id) in seen:
+            row["status"], row["reason"] = STATUS_SKIP, "повтор в списке"
+        else:
+            seen.add((row["type"], chat_id))
+            existing = existing_groups if row["type"] == ROW_GROUP else existing_admins
+            if remove:
+                if chat_id in existing:
+                    row["status"], row["reason"] = STATUS_REMOVE, None
+                else:
+                    row["status"], row["reason"] = STATUS_SKIP, "не найдено"
+            elif chat_id in existing:
+                row["status"], row["reason"] = STATUS_SKIP, "уже существует"
+            elif row["type"] == ROW_GROUP and not row["name"]:
+                row["status"], row["reason"] = STATUS_ERROR, "не указано название группы"
+            else:
+                row["status"], row["reason"] = STATUS_ADD, None
+        if row["status"] == STATUS_ERROR:
+            has_errors = True
+
+    return rows, has_errors
+
+
+def collect_changes(rows: List[dict]) -> Dict[str, list]:
+    """Собирает проверенные строки в пакет изменений для settings.apply_bulk_changes"""
+    changes = {"add_groups": [], "remove_group_ids": [], "add_admin_ids": [], "remove_admin_ids": []}
+    for row in rows:
+        if row["status"] == STATUS_ADD:
+            if row["type"] == ROW_GROUP:
+                changes["add_groups"].append({"id": row["id"], "name": row["name"]})
+            else:
+                changes["add_admin_ids"].append(row["id"])
+        elif row["status"] == STATUS_REMOVE:
+            key = "remove_group_ids" if row["type"] == ROW_GROUP else "remove_admin_ids"
+            changes[key].append(row["id"])
+    return changes
+
+
+def format_report(rows: List[dict], applied: bool) -> str:
+    """Формирует построчный отчёт о пакетной операции"""
+    icons = {STATUS_ADD: "✅", STATUS_REMOVE: "🗑", STATUS_SKIP: "➖", STATUS_ERROR: "❌"}
+    actions = {STATUS_ADD: "добавлено", STATUS_REMOVE: "удалено"}
+    lines = []
+    for row in rows:
+        kind = "группа" if row["type"] == ROW_GROUP else "админ"
+        label = f"{row['id']}" if row.get("id") is not None else f"{row['raw_id']!r}"
+        if row.get("name"):
+            label += f" ({row['name']})"
+        if row["status"] in actions:
+            result = actions[row["status"]] if applied else "не применено"
+        else:
+            result = row["reason"]
+        lines.append(f"{icons[row['status']]} строка {row['line']}: {kind} {label} — {result}")
+
+    counts = {status: sum(1 for row in rows if row["status"] == status) for status in icons}
+    if applied:
+        summary = (f"Итого: добавлено {counts[STATUS_ADD]}, удалено {counts[STATUS_REMOVE]}, "
+                   f"пропущено {counts[STATUS_SKIP]}, ошибок {counts[STATUS_ERROR]}")
+    else:
+        summary = (f"⚠️ Изменения не применены из-за ошибок.\n"
+                   f"Итого: к добавлению {counts[STATUS_ADD]}, к удалению {counts[STATUS_REMOVE]}, "
+                   f"пропущено {counts[STATUS_SKIP]}, ошибок {counts[STATUS_ERROR]}")
+    lines.append("")
+    lines.append(summary)
+    return "\n".join(lines)
+
+
+def export_json(groups: dict) -> bytes:
+    """Экспортирует группы и администраторов в JSON (формат groups.json)"""
+    payload = {
+        "admin_ids": list(groups.get("admin_ids", [])),
+        "group_chats": list(groups.get("group_chats", []))
+    }
+    return json.dumps(payload, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def export_csv(groups: dict) -> bytes:
+    """Экспортирует группы и администраторов в CSV с колонками type,id,name"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["type", "id", "name"])
+    for group in groups.get("group_chats", []):
+        writer.writerow([ROW_GROUP, group["id"], group.get("name", "")])
+    for admin_id in groups.get("admin_ids", []):
+        writer.writerow([ROW_ADMIN, admin_id, ""])
+    return buffer.getvalue().encode("utf-8-sig")
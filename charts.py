@@ -0,0 +1,193 @@
+# charts.py
+import asyncio
+import io
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import types
+from aiogram.types import BufferedInputFile
+from PIL import Image, ImageDraw, ImageFont
+
+from http_client import get_session
+from settings import load_settings
+
+logger = logging.getLogger(__name__)
+
+MARKET_CHART_URL = "https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
+
+# Диапазоны графика: ключ команды -> количество дней для CoinGecko
+CHART_RANGES = {"1d": 1, "7d": 7, "30d": 30}
+DEFAULT_CHART_RANGE = "1d"
+CHART_WORKERS = 1          # процессов для отрисовки (контейнер ограничен 0.5 CPU)
+CHART_SIZE = (800, 400)
+
+# Кэш графиков: {(coin_id, range, tick): {"png": bytes, "file_id": Optional[str]} или None, если построить не удалось}
+_chart_cache: Dict[Tuple[str, str, int], Optional[dict]] = {}
+# Графики, которые сейчас строятся: повторные запросы ждут тот же результат
+_pending: Dict[Tuple[str, str, int], asyncio.Future] = {}
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def current_tick() -> int:
+    """Номер текущего тика мониторинга (меняется раз в check_interval секунд)"""
+    settings = load_settings()
+    check_interval = settings.get("check_interval", 60) if settings else 60
+    return int(time.time() // max(int(check_interval), 1))
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=CHART_WORKERS)
+    return _executor
+
+
+def shutdown_chart_pool():
+    """Останавливает пул процессов отрисовки (вызывается при завершении бота)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def render_chart_png(points: List[Tuple[float, float]], title: str,
+                     size: Tuple[int, int] = CHART_SIZE) -> bytes:
+    """
+    Рисует линейный график цены и возвращает PNG.
+    points — список пар (timestamp в секундах, цена). Выполняется в отдельном процессе.
+    """
+    width, height = size
+    left, right, top, bottom = 70, 20, 40, 30
+    image = Image.new("RGB", size, (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    prices = [price for _, price in points]
+    low, high = min(prices), max(prices)
+    span = (high - low) or high or 1.0
+    t0, t1 = points[0][0], points[-1][0]
+    duration = (t1 - t0) or 1.0
+
+    # Сетка и подписи цен
+    for i in range(5):
+        y = top + (height - top - bottom) * i / 4
+        draw.line([(left, y), (width - right, y)], fill=(230, 230, 230))
+        draw.text((5, y - 6), f"{high - span * i / 4:.4f}", fill=(100, 100, 100), font=font)
+
+    xy = [
+        (left + (width - left - right) * (ts - t0) / duration,
+         top + (height - top - bottom) * (high - price) / span)
+        for ts, price in points
+    ]
+    color = (22, 163, 74) if prices[-1] >= prices[0] else (220, 38, 38)
+    if len(xy) > 1:
+        draw.line(xy, fill=color, width=2)
+
+    start = datetime.fromtimestamp(t0, tz=timezone.utc).strftime("%d.%m %H:%M")
+    end = datetime.fromtimestamp(t1, tz=timezone.utc).strftime("%d.%m %H:%M UTC")
+    draw.text((left, height - bottom + 8), start, fill=(100, 100, 100), font=font)
+    draw.text((width - right - 110, height - bottom + 8), end, fill=(100, 100, 100), font=font)
+    draw.text((left, 12), f"{title}   {prices[-1]:.4f}", fill=(0, 0, 0), font=font)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def fetch_price_history(coin_id: str, range_key: str) -> Optional[List[Tuple[float, float]]]:
+    """Получает историю цены в USD через CoinGecko /market_chart"""
+    url = MARKET_CHART_URL.format(coin_id=coin_id)
+    params = {"vs_currency": "usd", "days": CHART_RANGES[range_key]}
+    try:
+        session = get_session()
+        async with session.get(url, params=params, timeout=10) as resp:
+            if resp.status != 200:
+                logger.warning("API истории цен вернул статус %s", resp.status)
+                return None
+            data = await resp.json()
+        points = [(ts / 1000, float(price)) for ts, price in data.get("prices", [])]
+        return points or None
+    except Exception as e:
+        logger.warning("Ошибка при получении истории цен: %s", e)
+        return None
+
+
+async def _build_chart(coin_id: str, range_key: str) -> Optional[dict]:
+    points = await fetch_price_history(coin_id, range_key)
+    if not points:
+        return None
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    png = await loop.run_in_executor(
+        _get_executor(), render_chart_png, points, f"{coin_id.upper()} · {range_key}"
+    )
+    logger.info("График %s/%s построен за %.3f с (%d точек, %d байт)",
+                coin_id, range_key, time.perf_counter() - started, len(points), len(png))
+    return {"png": png, "file_id": None}
+
+
+async def get_chart(coin_id: str, range_key: str = DEFAULT_CHART_RANGE) -> Optional[dict]:
+    """
+    Возвращает график для (монета, диапазон, текущий тик).
+    Каждый график строится не больше одного раза за тик и используется всеми группами и пользователями.
+    """
+    if range_key not in CHART_RANGES:
+        raise ValueError(f"Неизвестный диапазон графика: {range_key}")
+    key = (coin_id, range_key, current_tick())
+
+    # None в кэше — график в этом тике построить не удалось, повторно API не запрашиваем
+    if key in _chart_cache:
+        return _chart_cache[key]
+    if key in _pending:
+        return await asyncio.shield(_pending[key])
+
+    future = asyncio.get_running_loop().create_future()
+    _pending[key] = future
+    entry = None
+    try:
+        entry = await _build_chart(coin_id, range_key)
+    except Exception as e:
+        logger.error("Ошибка при построении графика %s/%s: %s", coin_id, range_key, e)
+    finally:
+        del _pending[key]
+        # Ожидающие получают результат даже при отмене построения
+        future.set_result(entry)
+
+    # Графики прошлых тиков больше не нужны
+    for old_key in [k for k in _chart_cache if k[2] < key[2]]:
+        del _chart_cache[old_key]
+    _chart_cache[key] = entry
+    return entry
+
+
+def chart_photo(entry: dict):
+    """Возвращает file_id уже загруженного графика или файл для первой загрузки"""
+    if entry["file_id"]:
+        return entry["file_id"]
+    return BufferedInputFile(entry["png"], filename="chart.png")
+
+
+def remember_file_id(entry: dict, message: types.Message):
+    """Запоминает file_id отправленного графика, чтобы не загружать его повторно"""
+    if not entry["file_id"] and message and message.photo:
+        entry["file_id"] = message.photo[-1].file_id
+
+
+def export_state() -> dict:
+    """file_id загруженных графиков для снимка (state_snapshot.py); сами картинки не сохраняются"""
+    return {"file_ids": [
+        [coin_id, range_key, tick, entry["file_id"]]
+        for (coin_id, range_key, tick), entry in _chart_cache.items()
+        if entry is not None and entry["file_id"]
+    ]}
+
+
+def restore_state(state: dict):
+    """Восстанавливает file_id графиков текущего тика из снимка"""
+    tick = current_tick()
+    for coin_id, range_key, entry_tick, file_id in state.get("file_ids", []):
+        if int(entry_tick) == tick:
+            _chart_cache[(coin_id, range_key, tick)] = {"png": None, "file_id": file_id}
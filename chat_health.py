@@ -0,0 +1,233 @@
+# chat_health.py
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest, TelegramForbiddenError, TelegramMigrateToChat,
+    TelegramNotFound, TelegramRetryAfter
+)
+from config import CHAT_SWEEP_INTERVAL
+from settings import get_group_ids, remove_groups, replace_group_id
+
+logger = logging.getLogger(__name__)
+
+# Классы ошибок Telegram
+ERROR_FORBIDDEN = "forbidden"    # бота удалили из группы или заблокировали
+ERROR_NOT_FOUND = "not_found"    # чат не существует
+ERROR_MIGRATED = "migrated"      # группа стала супергруппой
+ERROR_FLOOD = "flood"            # сработал flood control
+ERROR_OTHER = "other"            # всё остальное (сеть, сервер Telegram и т.п.)
+
+DEAD_ERRORS = (ERROR_FORBIDDEN, ERROR_NOT_FOUND)
+
+FAILURE_THRESHOLD = 3        # сколько временных ошибок подряд открывают предохранитель
+BREAKER_COOLDOWN = 600       # на сколько секунд предохранитель отключает чат после временных ошибок
+DEAD_COOLDOWN = 86400        # на сколько секунд отключается "мёртвый" чат до проверки в sweep
+MAX_FLOOD_WAIT = 60          # дольше этого не ждём retry_after в рассылке
+SWEEP_BATCH_SIZE = 20        # сколько get_chat выполняется параллельно в одной пачке
+SWEEP_BATCH_PAUSE = 1.0      # пауза между пачками, чтобы не тратить лимит запросов
+
+# Состояние чатов: {chat_id: {"failures": int, "open_until": float, "dead": bool, "last_error": str}}
+_chat_states: Dict[int, dict] = {}
+
+
+def classify_error(error: Exception) -> str:
+    """Определяет класс ошибки Telegram"""
+    if isinstance(error, TelegramMigrateToChat):
+        return ERROR_MIGRATED
+    if isinstance(error, TelegramRetryAfter):
+        return ERROR_FLOOD
+    if isinstance(error, TelegramForbiddenError):
+        return ERROR_FORBIDDEN
+    if isinstance(error, TelegramNotFound):
+        return ERROR_NOT_FOUND
+    if isinstance(error, TelegramBadRequest) and "chat not found" in str(error).lower():
+        return ERROR_NOT_FOUND
+    return ERROR_OTHER
+
+
+def _get_state(chat_id: int) -> dict:
+    state = _chat_states.get(chat_id)
+    if state is None:
+        state = {"failures": 0, "open_until": 0.0, "dead": False, "last_error": None}
+        _chat_states[chat_id] = state
+    return state
+
+
+def get_chat_states() -> Dict[int, dict]:
+    """Возвращает копию состояния всех отслеживаемых чатов"""
+    return {chat_id: dict(state) for chat_id, state in _chat_states.items()}
+
+
+def is_chat_available(chat_id: int) -> bool:
+    """Проверяет, можно ли сейчас отправлять сообщения в чат (предохранитель закрыт)"""
+    state = _chat_states.get(chat_id)
+    if state is None:
+        return True
+    return time.monotonic() >= state["open_until"]
+
+
+def is_chat_dead(chat_id: int) -> bool:
+    """Проверяет, отмечен ли чат недоступным (бот удалён или чат не существует)"""
+    state = _chat_states.get(chat_id)
+    return state is not None and state["dead"]
+
+
+def record_success(chat_id: int):
+    """Сбрасывает счётчик ошибок чата после успешной отправки"""
+    if chat_id in _chat_states:
+        del _chat_states[chat_id]
+
+
+def record_reachable(chat_id: int):
+    """
+    Снимает отметку "мёртвого" чата, если get_chat снова его видит.
+    Счётчик ошибок и предохранитель от ошибок отправки не трогаются: get_chat не доказывает, что бот может писать в чат.
+    """
+    state = _chat_states.get(chat_id)
+    if state is None or not state["dead"]:
+        return
+    state["dead"] = False
+    state["open_until"] = 0.0
+    logger.info("Чат %s снова доступен", chat_id)
+
+
+def record_failure(chat_id: int, kind: str):
+    """Учитывает ошибку отправки и при необходимости открывает предохранитель"""
+    state = _get_state(chat_id)
+    state["failures"] += 1
+    state["last_error"] = kind
+    now = time.monotonic()
+    if kind in DEAD_ERRORS:
+        state["dead"] = True
+        state["open_until"] = now + DEAD_COOLDOWN
+        logger.warning("Чат %s недоступен (%s), отправка приостановлена до проверки", chat_id, kind)
+    elif state["failures"] >= FAILURE_THRESHOLD:
+        state["open_until"] = now + BREAKER_COOLDOWN
+        logger.warning("Чат %s: %d ошибок подряд, предохранитель открыт на %d с",
+                       chat_id, state["failures"], BREAKER_COOLDOWN)
+
+
+def _migrate_chat(old_id: int, new_id: int):
+    """Переносит чат на новый ID в groups.json и в состоянии"""
+    logger.info("Группа %s перенесена в супергруппу %s", old_id, new_id)
+    replace_group_id(old_id, new_id)
+    _chat_states.pop(old_id, None)
+
+
+async def deliver(bot: Bot, chat_id: int, send: Callable[[int], Awaitable]) -> Optional[int]:
+    """
+    Отправляет сообщение в чат с учётом его состояния.
+    send — корутина-функция, принимающая chat_id и выполняющая отправку.
+    Возвращает ID чата, в который доставлено сообщение (он меняется после миграции), или None.
+    """
+    for _ in range(3):
+        if not is_chat_available(chat_id):
+            logger.info("Чат %s пропущен: предохранитель открыт", chat_id)
+            return None
+        try:
+            await send(chat_id)
+            record_success(chat_id)
+            return chat_id
+        except Exception as e:
+            kind = classify_error(e)
+            if kind == ERROR_MIGRATED:
+                new_id = e.migrate_to_chat_id
+                _migrate_chat(chat_id, new_id)
+                chat_id = new_id
+                continue
+            if kind == ERROR_FLOOD and e.retry_after <= MAX_FLOOD_WAIT:
+                logger.warning("Flood control в чате %s, ждём %s с", chat_id, e.retry_after)
+                await asyncio.sleep(e.retry_after)
+                continue
+            record_failure(chat_id, kind)
+            logger.error("Ошибка при отправке в чат %s (%s): %s", chat_id, kind, e)
+            return None
+    return None
+
+
+async def sweep_dead_chats(bot: Bot) -> Dict[str, list]:
+    """
+    Проверяет все группы через get_chat пачками.
+    Удаляет недоступные группы из groups.json и обновляет ID перенесённых.
+    Группа удаляется, только если уже была отмечена "мёртвой" (ошибкой отправки или прошлой проверкой),
+    иначе она только отмечается — одна случайная ошибка не стирает её настройки.
+    """
+    group_ids = get_group_ids()
+    dead: List[int] = []
+    migrated: List[tuple] = []
+    logger.info("Проверка доступности %d групп(ы)", len(group_ids))
+
+    for start in range(0, len(group_ids), SWEEP_BATCH_SIZE):
+        batch = group_ids[start:start + SWEEP_BATCH_SIZE]
+        results = await asyncio.gather(*(bot.get_chat(chat_id) for chat_id in batch),
+                                       return_exceptions=True)
+        flood = None
+        for chat_id, result in zip(batch, results):
+            if not isinstance(result, Exception):
+                record_reachable(chat_id)
+                continue
+            kind = classify_error(result)
+            if kind in DEAD_ERRORS:
+                state = _chat_states.get(chat_id)
+                if state is not None and state["dead"]:
+                    dead.append(chat_id)
+                else:
+                    record_failure(chat_id, kind)
+            elif kind == ERROR_MIGRATED:
+                migrated.append((chat_id, result.migrate_to_chat_id))
+            elif kind == ERROR_FLOOD:
+                flood = result.retry_after
+            else:
+                logger.warning("Не удалось проверить чат %s: %s", chat_id, result)
+        if flood is not None:
+            # Не тратим лимит дальше — оставшиеся группы проверим в следующий раз
+            logger.warning("Flood control при проверке групп, проверка прервана (retry_after=%s)", flood)
+            break
+        if start + SWEEP_BATCH_SIZE < len(group_ids):
+            await asyncio.sleep(SWEEP_BATCH_PAUSE)
+
+    for old_id, new_id in migrated:
+        _migrate_chat(old_id, new_id)
+    if dead:
+        remove_groups(dead)
+        for chat_id in dead:
+            _chat_states.pop(chat_id, None)
+        logger.info("Удалены недоступные группы: %s", dead)
+
+    return {"dead": dead, "migrated": migrated}
+
+
+async def chat_health_sweep_loop(bot: Bot):
+    """Фоновая задача периодической проверки групп"""
+    logger.info("Начало цикла проверки доступности групп")
+    while True:
+        await asyncio.sleep(CHAT_SWEEP_INTERVAL)
+        try:
+            await sweep_dead_chats(bot)
+        except Exception as e:
+            logger.error("Ошибка в chat_health_sweep_loop: %s", e)
+
+
+def export_state() -> dict:
+    """Состояние чатов для снимка (state_snapshot.py); время предохранителя переводится в обычные часы"""
+    offset = time.time() - time.monotonic()
+    return {"chats": {
+        str(chat_id): dict(state, open_until=state["open_until"] + offset)
+        for chat_id, state in _chat_states.items()
+    }}
+
+
+def restore_state(state: dict):
+    """Восстанавливает состояние чатов из снимка"""
+    offset = time.time() - time.monotonic()
+    for chat_id, chat_state in state.get("chats", {}).items():
+        _chat_states[int(chat_id)] = {
+            "failures": int(chat_state["failures"]),
+            "open_until": float(chat_state["open_until"]) - offset,
+            "dead": bool(chat_state["dead"]),
+            "last_error": chat_state.get("last_error")
+        }
@@ -0,0 +1,126 @@
+# coin_index.py
+import asyncio
+import bisect
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import COIN_INDEX_REFRESH
+from http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+COINS_LIST_URL = "https://api.coingecko.com/api/v3/coins/list"
+RETRY_INTERVAL = 300  # через сколько секунд повторить загрузку, если она не удалась
+
+# Монеты CoinGecko: {coin_id: {"id": str, "symbol": str, "name": str}}
+_coins: Dict[str, dict] = {}
+# Отсортированные пары (ключ в нижнем регистре, coin_id) для поиска по префиксу
+_symbol_index: List[Tuple[str, str]] = []
+_name_index: List[Tuple[str, str]] = []
+_loaded_at: Optional[float] = None
+
+
+def build_index(coins: List[dict]):
+    """Строит индекс по символам и названиям монет"""
+    global _coins, _symbol_index, _name_index, _loaded_at
+    by_id = {}
+    for coin in coins:
+        if not coin.get("id") or not coin.get("symbol") or not coin.get("name"):
+            continue
+        by_id[coin["id"]] = {"id": coin["id"], "symbol": coin["symbol"], "name": coin["name"]}
+
+    # Заменяем индекс целиком, чтобы поиск никогда не видел его наполовину построенным
+    _symbol_index = sorted((coin["symbol"].lower(), coin_id) for coin_id, coin in by_id.items())
+    _name_index = sorted((coin["name"].lower(), coin_id) for coin_id, coin in by_id.items())
+    _coins = by_id
+    _loaded_at = time.time()
+    logger.info("Индекс монет построен: %d монет", len(by_id))
+
+
+async def load_coin_index() -> bool:
+    """Загружает список монет CoinGecko и перестраивает индекс"""
+    try:
+        session = get_session()
+        async with session.get(COINS_LIST_URL, timeout=30) as resp:
+            if resp.status != 200:
+                logger.warning("API списка монет вернул статус %s", resp.status)
+                return False
+            coins = await resp.json()
+    except Exception as e:
+        logger.warning("Ошибка при загрузке списка монет: %s", e)
+        return False
+
+    build_index(coins)
+    return True
+
+
+def get_coin(coin_id: str) -> Optional[dict]:
+    """Возвращает монету по её ID на CoinGecko"""
+    return _coins.get(coin_id)
+
+
+def _prefix_matches(index: List[Tuple[str, str]], prefix: str, limit: int) -> List[str]:
+    start = bisect.bisect_left(index, (prefix, ""))
+    result = []
+    for key, coin_id in index[start:]:
+        if not key.startswith(prefix) or len(result) >= limit:
+            break
+        result.append(coin_id)
+    return result
+
+
+def search_coins(query: str, limit: int = 20) -> List[dict]:
+    """
+    Ищет монеты по префиксу символа или названия.
+    Сначала идут точные совпадения символа, затем совпадения по префиксу символа и названия.
+    """
+    prefix = query.strip().lower()
+    if not prefix:
+        return []
+
+    exact, by_symbol = [], []
+    for coin_id in _prefix_matches(_symbol_index, prefix, limit * 2):
+        (exact if _coins[coin_id]["symbol"].lower() == prefix else by_symbol).append(coin_id)
+    by_name = _prefix_matches(_name_index, prefix, limit)
+
+    result, seen = [], set()
+    for coin_id in exact + by_symbol + by_name:
+        if coin_id not in seen:
+            seen.add(coin_id)
+            result.append(_coins[coin_id])
+        if len(result) >= limit:
+            break
+    return result
+
+
+async def coin_index_refresh_loop():
+    """Фоновая задача загрузки и периодического обновления индекса монет"""
+    logger.info("Начало цикла обновления индекса монет")
+    # Если индекс восстановлен из снимка и ещё свежий, первое обновление откладываем
+    if _loaded_at is not None:
+        await asyncio.sleep(max(0.0, COIN_INDEX_REFRESH - (time.time() - _loaded_at)))
+    while True:
+        try:
+            loaded = await load_coin_index()
+        except Exception as e:
+            logger.error("Ошибка в coin_index_refresh_loop: %s", e)
+            loaded = False
+        await asyncio.sleep(COIN_INDEX_REFRESH if loaded else RETRY_INTERVAL)
+
+
+def export_state() -> dict:
+    """Индекс монет для снимка (state_snapshot.py)"""
+    return {
+        "coins": [[coin["id"], coin["symbol"], coin["name"]] for coin in _coins.values()],
+        "loaded_at": _loaded_at
+    }
+
+
+def restore_state(state: dict):
+    """Восстанавливает индекс монет из снимка"""
+    global _loaded_at
+    if state.get("loaded_at") is None:
+        return
+    build_index([{"id": coin_id, "symbol": symbol, "name": name} for coin_id, symbol, name in state["coins"]])
+    _loaded_at = float(state["loaded_at"])
@@ -0,0 +1,105 @@
+# concurrency.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+# Классы дорогих обработчиков (указываются флагом resource при регистрации)
+RESOURCE_PRICE_API = "price_api"  # обращаются к API цен
+RESOURCE_FILES = "files"          # записывают файлы настроек и групп
+
+
+class ConcurrencyGovernor(BaseMiddleware):
+    """
+    Внешний middleware для всех обновлений.
+    Ограничивает число одновременно работающих обработчиков и длину очереди ожидания:
+    если очередь заполнена, новое обновление отбрасывается (сбрасывается самое свежее).
+    """
+
+    def __init__(self, limit: int, max_pending: int):
+        self.limit = limit
+        self.max_pending = max_pending
+        self.pending = 0
+        self.in_flight = 0
+        self.shed = 0
+        self.closing = False
+        self._semaphore = asyncio.Semaphore(limit)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if self.closing:
+            self.shed += 1
+            logger.info("Бот останавливается, обновление отброшено")
+            return None
+        if self._semaphore.locked() and self.pending >= self.max_pending:
+            self.shed += 1
+            logger.warning("Очередь обработчиков заполнена (%d), обновление отброшено (всего отброшено: %d)",
+                           self.pending, self.shed)
+            return None
+
+        self.pending += 1
+        self._idle.clear()
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self.pending -= 1
+            self._update_idle()
+            raise
+        self.pending -= 1
+        self.in_flight += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self._update_idle()
+
+    def _update_idle(self):
+        if self.in_flight == 0 and self.pending == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Перестаёт принимать обновления и ждёт завершения начатых обработчиков не дольше timeout"""
+        self.closing = True
+        logger.info("Ожидание завершения обработчиков: выполняется %d, в очереди %d", self.in_flight, self.pending)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            logger.info("Все обработчики завершены")
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("Не дождались завершения обработчиков за %.0f с: выполняется %d, в очереди %d",
+                           timeout, self.in_flight, self.pending)
+            return False
+
+
+class ResourceLimiter(BaseMiddleware):
+    """
+    Внутренний middleware: отдельные лимиты для дорогих обработчиков.
+    Класс обработчика берётся из флага resource, заданного при регистрации.
+    """
+
+    def __init__(self, limits: Dict[str, int]):
+        self._semaphores = {resource: asyncio.Semaphore(limit) for resource, limit in limits.items()}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        semaphore = self._semaphores.get(get_flag(data, "resource"))
+        if semaphore is None:
+            return await handler(event, data)
+        async with semaphore:
+            return await handler(event, data)
@@ -9,6 +9,27 @@ GROUP_CHAT_ID = int(os.getenv("GROUP_CHAT_ID", "0"))  # ID группового
 COIN_ID = os.getenv("COIN_ID", "flower-2")         # id на CoinGecko (по умолчанию flower-2)
 PRICE_CHANGE_THRESHOLD = float(os.getenv("PRICE_CHANGE_THRESHOLD", "15"))  # порог в %
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL", "60"))  # интервал проверки в секундах
+PRICE_CACHE_TTL = int(os.getenv("PRICE_CACHE_TTL", "60"))  # сколько секунд цена в кэше считается актуальной
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "30"))  # cache_time для ответов на inline-запросы
+COIN_INDEX_REFRESH = int(os.getenv("COIN_INDEX_REFRESH", "86400"))  # интервал обновления списка монет CoinGecko
+DISPLAY_CURRENCIES = [c.strip().lower() for c in os.getenv("DISPLAY_CURRENCIES", "usd,eur,rub").split(",") if c.strip()]  # валюты в сообщениях
+FX_REFRESH_INTERVAL = int(os.getenv("FX_REFRESH_INTERVAL", "3600"))  # интервал обновления курсов валют в секундах
+FX_MAX_AGE = int(os.getenv("FX_MAX_AGE", "21600"))  # старше этого курсы не используются, берутся прямые котировки
+CHAT_SWEEP_INTERVAL = int(os.getenv("CHAT_SWEEP_INTERVAL", "3600"))  # интервал проверки доступности групп в секундах
+STATE_FILE = os.getenv("STATE_FILE", "state.json")  # файл снимка состояния для быстрого перезапуска
+SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", "300"))  # интервал сохранения снимка в секундах
+HANDLER_CONCURRENCY = int(os.getenv("HANDLER_CONCURRENCY", "32"))  # сколько обработчиков обновлений работают одновременно
+PRICE_API_CONCURRENCY = int(os.getenv("PRICE_API_CONCURRENCY", "4"))  # из них обращаются к API цен
+FILE_OPS_CONCURRENCY = int(os.getenv("FILE_OPS_CONCURRENCY", "1"))  # из них записывают файлы
+MAX_PENDING_UPDATES = int(os.getenv("MAX_PENDING_UPDATES", "200"))  # длина очереди; сверх неё обновления отбрасываются
+DRAIN_TIMEOUT = int(os.getenv("DRAIN_TIMEOUT", "10"))  # сколько секунд ждать завершения работы при остановке
+HTTP_CONNECTION_LIMIT = int(os.getenv("HTTP_CONNECTION_LIMIT", "10"))  # соединений в общей HTTP-сессии
+HEALTH_HOST = os.getenv("HEALTH_HOST", "0.0.0.0")  # адрес сервера проверок /healthz и /readyz
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "8080"))  # порт сервера проверок (0 — не запускать)
+HEALTH_MAX_HEARTBEAT_AGE = int(os.getenv("HEALTH_MAX_HEARTBEAT_AGE", "0"))  # цикл мониторинга молчит дольше — бот неисправен (0 или меньше 2×check_interval — 2×check_interval)
+HEALTH_MAX_FETCH_AGE = int(os.getenv("HEALTH_MAX_FETCH_AGE", "900"))  # цена не получалась дольше — бот не готов
+HEALTH_MAX_POLL_AGE = int(os.getenv("HEALTH_MAX_POLL_AGE", "120"))  # getUpdates не удавался дольше — бот не готов
+HEALTH_MAX_LOOP_LAG = float(os.getenv("HEALTH_MAX_LOOP_LAG", "5"))  # допустимая задержка цикла событий (секунды)
 CHAT_LINK = os.getenv("CHAT_LINK", "https://t.me/+fhJvtNvdAttkNTky")  # ссылка на чат
 PRIVATE_MESSAGE_TEXT = os.getenv("PRIVATE_MESSAGE_TEXT", "🚫 У меня нет желания общаться с фермерами!\n\n👉 Пиши в чат:")  # текст сообщения в личке
 ASSETS_DIR = os.getenv("ASSETS_DIR", "assets")     # папка с картинками
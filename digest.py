@@ -0,0 +1,119 @@
+# digest.py
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from aiogram import Bot
+from chat_health import deliver, is_chat_dead
+from settings import get_group_digest_windows, get_group_locale
+from templates import DEFAULT_LOCALE, render_caption
+import health
+
+logger = logging.getLogger(__name__)
+
+DIGEST_CURRENCY = "usd"   # валюта, по которой строится сводка
+FLUSH_CHECK_INTERVAL = 30  # как часто проверять, не пора ли отправить сводки (секунды)
+
+# Накопленные сводки по группам:
+# {group_id: {"open", "close", "high", "low": float, "crossings": int, "started": float, "window": int}}
+_buckets: Dict[int, dict] = {}
+
+
+def record_trigger(group_id: int, window: int, old_price: float, new_price: float):
+    """Учитывает срабатывание порога для группы в режиме сводки"""
+    bucket = _buckets.get(group_id)
+    if bucket is None:
+        bucket = {
+            "open": old_price, "close": new_price,
+            "high": max(old_price, new_price), "low": min(old_price, new_price),
+            "crossings": 0, "started": time.time(), "window": window
+        }
+        _buckets[group_id] = bucket
+        logger.info("Начата сводка для группы %s (окно %d с)", group_id, window)
+    bucket["crossings"] += 1
+    observe_price(new_price, group_id)
+
+
+def observe_price(price: float, group_id: Optional[int] = None):
+    """Обновляет закрытие, максимум и минимум открытых сводок (или одной сводки группы)"""
+    buckets = [_buckets[group_id]] if group_id is not None else _buckets.values()
+    for bucket in buckets:
+        bucket["close"] = price
+        bucket["high"] = max(bucket["high"], price)
+        bucket["low"] = min(bucket["low"], price)
+
+
+def format_digest(bucket: dict, now: Optional[float] = None, locale: str = DEFAULT_LOCALE) -> str:
+    """Формирует текст сводки на языке группы"""
+    now = now or time.time()
+    pct = ((bucket["close"] - bucket["open"]) / bucket["open"]) * 100 if bucket["open"] else 0.0
+    return render_caption("digest", locale, values={
+        "start": datetime.fromtimestamp(bucket["started"]).strftime("%H:%M"),
+        "end": datetime.fromtimestamp(now).strftime("%H:%M"),
+        "open": f"{bucket['open']:.4f}", "close": f"{bucket['close']:.4f}",
+        "high": f"{bucket['high']:.4f}", "low": f"{bucket['low']:.4f}",
+        "change": f"{'+' if pct > 0 else ''}{pct:.2f}%",
+        "crossings": str(bucket["crossings"])
+    })
+
+
+async def flush_due_digests(bot: Bot, force: bool = False) -> int:
+    """Отправляет сводки, у которых закончилось окно. Возвращает количество отправленных"""
+    now = time.time()
+    # Сводки групп, удалённых из groups.json или вышедших из режима сводки, больше не нужны
+    windows = get_group_digest_windows()
+    for group_id in [group_id for group_id in _buckets if group_id not in windows]:
+        del _buckets[group_id]
+        logger.info("Сводка для группы %s отброшена: группа удалена или режим сводки выключен", group_id)
+    due = [group_id for group_id, bucket in _buckets.items()
+           if force or now - bucket["started"] >= bucket["window"]]
+    sent = 0
+    for group_id in due:
+        # Сводка убирается только после доставки: при ошибке или остановке бота она останется
+        # в накоплении (и в снимке состояния) и будет отправлена при следующей проверке
+        bucket = _buckets[group_id]
+        text = format_digest(bucket, now, get_group_locale(group_id, DEFAULT_LOCALE))
+
+        async def send_digest(chat_id: int):
+            await bot.send_message(chat_id=chat_id, text=text)
+
+        if await deliver(bot, group_id, send_digest) is not None:
+            if _buckets.get(group_id) is bucket:
+                del _buckets[group_id]
+            sent += 1
+            health.record_broadcast()
+            logger.info("Сводка отправлена в группу %s (%d пересечений)", group_id, bucket["crossings"])
+        elif is_chat_dead(group_id):
+            # В недоступный чат сводку уже не доставить — не копим её дальше
+            _buckets.pop(group_id, None)
+            logger.info("Сводка для недоступной группы %s отброшена", group_id)
+    return sent
+
+
+async def digest_flush_loop(bot: Bot):
+    """Фоновая задача отправки сводок по окончании окна"""
+    logger.info("Начало цикла отправки сводок")
+    while True:
+        await asyncio.sleep(FLUSH_CHECK_INTERVAL)
+        try:
+            await flush_due_digests(bot)
+        except Exception as e:
+            logger.error("Ошибка в digest_flush_loop: %s", e)
+
+
+def export_state() -> dict:
+    """Накопленные сводки для снимка (state_snapshot.py)"""
+    return {"buckets": {str(group_id): bucket for group_id, bucket in _buckets.items()}}
+
+
+def restore_state(state: dict):
+    """Восстанавливает накопленные сводки из снимка"""
+    for group_id, bucket in state.get("buckets", {}).items():
+        _buckets[int(group_id)] = {
+            "open": float(bucket["open"]), "close": float(bucket["close"]),
+            "high": float(bucket["high"]), "low": float(bucket["low"]),
+            "crossings": int(bucket["crossings"]), "started": float(bucket["started"]),
+            "window": int(bucket["window"])
+        }
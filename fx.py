@@ -0,0 +1,103 @@
+# fx.py
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+from config import DISPLAY_CURRENCIES, FX_MAX_AGE, FX_REFRESH_INTERVAL
+from http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+FX_URL = "https://api.coingecko.com/api/v3/exchange_rates"
+BASE_CURRENCY = "usd"
+RETRY_INTERVAL = 300  # через сколько секунд повторить загрузку, если она не удалась
+
+# Таблица курсов: {"rates": {валюта: единиц валюты за 1 USD}, "ts": время загрузки}
+_fx = {"rates": {}, "ts": None}
+
+
+def set_fx_rates(rates: Dict[str, float], ts: Optional[float] = None):
+    """Заменяет таблицу курсов"""
+    _fx["rates"] = dict(rates)
+    _fx["ts"] = ts if ts is not None else time.time()
+
+
+def get_fx_rates(max_age: Optional[float] = FX_MAX_AGE) -> Optional[Dict[str, float]]:
+    """Возвращает таблицу курсов или None, если её нет или она старше max_age секунд"""
+    if _fx["ts"] is None:
+        return None
+    if max_age is not None and time.time() - _fx["ts"] > max_age:
+        return None
+    return _fx["rates"]
+
+
+async def refresh_fx_rates() -> bool:
+    """
+    Загружает курсы валют через CoinGecko /exchange_rates.
+    API отдаёт курсы относительно BTC, пересчитываем их относительно USD.
+    """
+    try:
+        session = get_session()
+        async with session.get(FX_URL, timeout=10) as resp:
+            if resp.status != 200:
+                logger.warning("API курсов валют вернул статус %s", resp.status)
+                return False
+            data = await resp.json()
+        btc_rates = {c: float(r["value"]) for c, r in data.get("rates", {}).items() if r.get("type") == "fiat"}
+    except Exception as e:
+        logger.warning("Ошибка при получении курсов валют: %s", e)
+        return False
+
+    usd = btc_rates.get(BASE_CURRENCY)
+    if not usd:
+        logger.warning("В курсах валют нет %s", BASE_CURRENCY.upper())
+        return False
+    set_fx_rates({c: value / usd for c, value in btc_rates.items()})
+    logger.info("Курсы валют обновлены: %s", {c: _fx["rates"].get(c) for c in DISPLAY_CURRENCIES})
+    return True
+
+
+def derive_prices(prices: Dict[str, float], currencies=None) -> Optional[Dict[str, float]]:
+    """
+    Пересчитывает цену в USD в остальные валюты по таблице курсов.
+    Возвращает None, если таблица устарела или в ней нет нужной валюты.
+    """
+    currencies = currencies or DISPLAY_CURRENCIES
+    if not prices or BASE_CURRENCY not in prices:
+        return None
+    rates = get_fx_rates()
+    if rates is None:
+        return None
+    if any(c not in rates for c in currencies):
+        return None
+    usd_price = prices[BASE_CURRENCY]
+    result = {c: usd_price * rates[c] for c in currencies}
+    result[BASE_CURRENCY] = usd_price
+    return result
+
+
+async def fx_refresh_loop():
+    """Фоновая задача обновления таблицы курсов валют"""
+    logger.info("Начало цикла обновления курсов валют")
+    # Если курсы восстановлены из снимка и ещё свежие, первое обновление откладываем
+    if _fx["ts"] is not None:
+        await asyncio.sleep(max(0.0, FX_REFRESH_INTERVAL - (time.time() - _fx["ts"])))
+    while True:
+        try:
+            loaded = await refresh_fx_rates()
+        except Exception as e:
+            logger.error("Ошибка в fx_refresh_loop: %s", e)
+            loaded = False
+        await asyncio.sleep(FX_REFRESH_INTERVAL if loaded else RETRY_INTERVAL)
+
+
+def export_state() -> dict:
+    """Состояние таблицы курсов для снимка (state_snapshot.py)"""
+    return {"rates": _fx["rates"], "ts": _fx["ts"]}
+
+
+def restore_state(state: dict):
+    """Восстанавливает таблицу курсов из снимка"""
+    if state.get("ts") is not None:
+        set_fx_rates({c: float(v) for c, v in state["rates"].items()}, float(state["ts"]))
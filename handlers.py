@@ -1,32 +1,21 @@
 # handlers.py
 from aiogram import types
+from aiogram.types import BufferedInputFile, InlineQueryResultArticle, InputTextMessageContent
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.filters import Command
-from config import CHAT_LINK, PRIVATE_MESSAGE_TEXT, GROUP_CHAT_ID
-from price_checker import fetch_current_prices, CURRENCIES
-from settings import load_settings, save_settings, is_admin, add_admin, remove_admin, add_group, remove_group, load_groups
+from config import CHAT_LINK, PRIVATE_MESSAGE_TEXT, GROUP_CHAT_ID, COIN_ID, INLINE_CACHE_TIME, PRICE_CACHE_TTL
+from price_checker import get_current_prices, get_cached_prices, get_display_prices, watch_coins
+from fx import derive_prices
+from state_snapshot import mark_first_response
+from templates import render_caption, render_currency_lines, normalize_locale, DEFAULT_LOCALE, LOCALES
+from coin_index import search_coins, get_coin
+from charts import get_chart, chart_photo, remember_file_id, CHART_RANGES, DEFAULT_CHART_RANGE
+from settings import load_settings, save_settings, is_admin, add_admin, remove_admin, add_group, remove_group, load_groups, apply_bulk_changes, set_group_digest, get_group_locale, set_group_locale
+from bulk_ops import MAX_IMPORT_SIZE, BulkParseError, parse_document, parse_text_rows, validate_rows, collect_changes, format_report, export_json, export_csv
 from datetime import datetime
 import logging
 import random
 
-# Список вариантов ответов для команды /price
-PRICE_RESPONSE_TEMPLATES = [
-    """Ах, курс валют. Золото меркнет перед точными цифрами. Запомните:  
-{currency_lines}
-Теперь идите и используйте их с умом… во благо моей казны.""",
-
-    """Простолюдины, внимайте! Сегодня мои казначеи установили следующие курсы:  
-{currency_lines}
-Любая прибыль с обмена — в королевскую казну, разумеется.""",
-
-    """Запишите, крестьяне, дабы не тратить моё время на расспросы:  
-{currency_lines}
-И помните — ваши монеты уже мысленно принадлежат мне.""",
-
-    """Казна требует точности! Сегодняшние курсы:  
-{currency_lines}
-Любая выгода с обмена — моя. Даже не думайте иначе."""
-]
 # Список вариантов ответов для личных сообщений
 PRIVATE_MESSAGE_RESPONSE_TEMPLATES = [
     """🚫 Сегодня я не намерен тратить время на простолюдинов!  
@@ -55,44 +44,114 @@ async def price_command_handler(message: types.Message):
                  message.from_user.username, message.from_user.id,
                  message.chat.title, message.chat.id)
     
-    # Получаем текущие цены
-    current = await fetch_current_prices()
+    # Локаль шаблонов: из настроек группы, для остальных чатов — по умолчанию
+    locale = get_group_locale(message.chat.id, DEFAULT_LOCALE)
+    
+    # Получаем текущие цены (из кэша, если они свежие)
+    current = await get_current_prices()
     
     if current is None:
-        # Список вариантов ответов при ошибке получения курса
-        PRICE_ERROR_TEMPLATES = [
-            "❌ Даже мои казначеи не смогли добыть данные о курсе. Вернитесь, когда они перестанут бездельничать.",
-            "❌ Курс недоступен. Видимо, ваши жалкие рынки сегодня спят. Попробуйте позже.",
-            "❌ Не удалось узнать курс. Моё терпение ограничено, так что приходите, когда будет информация."
-        ]
-        await message.answer(random.choice(PRICE_ERROR_TEMPLATES))
+        await message.answer(render_caption("price_error", locale))
         logger.warning("Не удалось получить текущий курс для пользователя %s (%s) из чата %s (%s)",
                          message.from_user.username, message.from_user.id,
                          message.chat.title, message.chat.id)
         return
     
-    # Формируем строки с курсами для подстановки в шаблон
-    lines = []
-    emoji_map = {"usd": ""}
-    for c in CURRENCIES:
-        price = current.get(c)
-        if price is not None:
-            line = f"{c.upper()}: {price:.4f}"
-        else:
-            line = f"{c.upper()}: —"
-        lines.append(line)
+    # Остальные валюты пересчитываются из USD по таблице курсов, без лишних запросов к API
+    current = await get_display_prices(current)
     
-    # Выбираем случайный шаблон ответа и подставляем в него курсы
-    template = random.choice(PRICE_RESPONSE_TEMPLATES)
-    currency_lines = "\n".join(lines)
-    caption = template.format(currency_lines=currency_lines)
+    # Выбираем случайный шаблон ответа; одинаковые подписи рендерятся один раз и берутся из кэша
+    caption = render_caption("price", locale, current)
     
     await message.answer(caption)
+    mark_first_response()
     logger.info("Отправлен курс пользователю %s (%s) из чата %s (%s)",
                  message.from_user.username, message.from_user.id,
                  message.chat.title, message.chat.id)
 
 
+async def chart_command_handler(message: types.Message):
+    """
+    Обработчик команды /chart.
+    Отправляет график цены монеты за выбранный период.
+    """
+    locale = get_group_locale(message.chat.id, DEFAULT_LOCALE)
+    args = message.text.split()
+    range_key = args[1].lower() if len(args) > 1 else DEFAULT_CHART_RANGE
+    if range_key not in CHART_RANGES:
+        await message.answer(render_caption("chart_usage", locale, values={"ranges": "|".join(CHART_RANGES)}))
+        return
+
+    logger.info("Пользователь %s (%s) из чата %s (%s) запросил график %s",
+                message.from_user.username, message.from_user.id,
+                message.chat.title, message.chat.id, range_key)
+
+    chart = await get_chart(COIN_ID, range_key)
+    if chart is None:
+        await message.answer(render_caption("chart_error", locale))
+        return
+
+    caption = render_caption("chart_caption", locale, values={"coin": COIN_ID.upper(), "range": range_key})
+    sent = await message.answer_photo(chart_photo(chart), caption=caption)
+    remember_file_id(chart, sent)
+    mark_first_response()
+
+
+INLINE_RESULTS_LIMIT = 20     # максимум карточек в ответе на inline-запрос
+INLINE_PENDING_CACHE_TIME = 5  # cache_time, пока цены части монет ещё не загружены
+INLINE_MAX_PRICE_AGE = 2 * PRICE_CACHE_TTL  # более старая цена из кэша в карточку не попадает
+
+
+async def inline_query_handler(query: types.InlineQuery):
+    """
+    Обработчик inline-запросов (@bot flower).
+    Ищет монеты по индексу и отвечает карточками с ценами из кэша, без запросов к API.
+    """
+    text = query.query.strip()
+    # Inline-запрос не привязан к группе — язык берём из настроек Telegram пользователя
+    locale = normalize_locale((query.from_user.language_code or "")[:2])
+    logger.info("Inline-запрос от пользователя %s (%s): %r", query.from_user.username, query.from_user.id, text)
+
+    if text:
+        coins = search_coins(text, INLINE_RESULTS_LIMIT)
+    else:
+        # Пустой запрос — показываем основную монету
+        coins = [get_coin(COIN_ID) or {"id": COIN_ID, "symbol": COIN_ID, "name": COIN_ID}]
+
+    # Цены запрошенных монет будут подгружены фоновой задачей price_cache_refresh_loop
+    watch_coins([coin["id"] for coin in coins])
+
+    results = []
+    all_priced = True
+    for coin in coins:
+        title = f"{coin['name']} ({coin['symbol'].upper()})"
+        prices = get_cached_prices(coin["id"], INLINE_MAX_PRICE_AGE)
+        if prices is None:
+            all_priced = False
+            description = render_caption("inline_loading", locale)
+            message_text = f"{title}\n{description}"
+        else:
+            # Inline-режим не делает запросов к API: валюты только по таблице курсов
+            prices = derive_prices(prices) or prices
+            currency_lines = render_currency_lines(prices)
+            description = currency_lines.replace("\n", ", ")
+            message_text = render_caption("inline_price", locale, prices, values={"title": title})
+        results.append(InlineQueryResultArticle(
+            id=coin["id"][:64],
+            title=title,
+            description=description,
+            input_message_content=InputTextMessageContent(message_text=message_text)
+        ))
+
+    await query.answer(
+        results,
+        cache_time=INLINE_CACHE_TIME if all_priced else INLINE_PENDING_CACHE_TIME,
+        # Общий кэш Telegram — только для ответов на языке по умолчанию, иначе язык попадёт к другим пользователям
+        is_personal=locale != DEFAULT_LOCALE
+    )
+    mark_first_response()
+
+
 # Отладочные обработчики удалены
 async def private_message_handler(message: types.Message):
     """
@@ -148,6 +207,97 @@ async def set_threshold_handler(message: types.Message):
     await message.answer(f"✅ Порог изменения цены установлен на {new_threshold}%")
 
 
+async def set_urgent_threshold_handler(message: types.Message):
+    """Обработчик команды /set_urgent_threshold для изменения порога срочных уведомлений в режиме сводки"""
+    # Проверка прав администратора
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав для выполнения этой команды")
+        return
+    
+    # Парсинг аргумента команды
+    args = message.text.split()
+    if len(args) < 2:
+        await message.answer("❌ Использование: /set_urgent_threshold <значение>")
+        return
+    
+    try:
+        new_threshold = float(args[1])
+        if new_threshold <= 0:
+            await message.answer("❌ Порог должен быть положительным числом")
+            return
+    except ValueError:
+        await message.answer("❌ Неверный формат числа")
+        return
+    
+    # Загрузка текущих настроек
+    settings = load_settings()
+    if not settings:
+        settings = {"price_change_threshold": 15.0, "check_interval": 60}
+    
+    settings["urgent_threshold"] = new_threshold
+    save_settings(settings)
+    
+    await message.answer(f"✅ Порог срочных уведомлений установлен на {new_threshold}%")
+
+
+async def set_digest_handler(message: types.Message):
+    """Обработчик команды /set_digest для включения режима сводки в группе"""
+    # Проверка прав администратора
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав для выполнения этой команды")
+        return
+    
+    # Парсинг аргументов команды
+    args = message.text.split()
+    if len(args) < 3:
+        await message.answer("❌ Использование: /set_digest <id группы> <минуты> (0 — выключить)")
+        return
+    
+    try:
+        group_id = int(args[1])
+        minutes = int(args[2])
+        if minutes < 0:
+            raise ValueError
+    except ValueError:
+        await message.answer("❌ Неверный формат ID группы или количества минут")
+        return
+    
+    if not set_group_digest(group_id, minutes * 60):
+        await message.answer("❌ Группа не найдена")
+        return
+    
+    if minutes:
+        await message.answer(f"✅ Группа {group_id} получает сводку раз в {minutes} мин")
+    else:
+        await message.answer(f"✅ Режим сводки для группы {group_id} выключен")
+
+
+async def set_locale_handler(message: types.Message):
+    """Обработчик команды /set_locale для выбора языка сообщений группы"""
+    # Проверка прав администратора
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав для выполнения этой команды")
+        return
+    
+    # Парсинг аргументов команды
+    args = message.text.split()
+    if len(args) < 3 or args[2].lower() not in LOCALES:
+        await message.answer(f"❌ Использование: /set_locale <id группы> <{'|'.join(LOCALES)}>")
+        return
+    
+    try:
+        group_id = int(args[1])
+    except ValueError:
+        await message.answer("❌ Неверный формат ID группы")
+        return
+    
+    locale = args[2].lower()
+    if set_group_locale(group_id, locale):
+        await message.answer(f"✅ Язык сообщений группы {group_id}: {locale}")
+    else:
+        await message.answer("❌ Группа не найдена")
+
+
 async def add_group_handler(message: types.Message):
     """Обработчик команды /add_group для добавления новой группы"""
     # Проверка прав администратора
@@ -232,7 +382,12 @@ async def list_groups_handler(message: types.Message):
     
     lines = ["📝 Список отслеживаемых групп:"]
     for group in groups["group_chats"]:
-        lines.append(f"  • {group['name']} (ID: {group['id']})")
+        line = f"  • {group['name']} (ID: {group['id']})"
+        if group.get("locale"):
+            line += f" [{group['locale']}]"
+        if group.get("digest_window"):
+            line += f" — сводка раз в {group['digest_window'] // 60} мин"
+        lines.append(line)
     
     await message.answer("\n".join(lines))
 
@@ -289,3 +444,111 @@ async def remove_admin_handler(message: types.Message):
         await message.answer("❌ Пользователь не найден в списке администраторов")
     logger.debug("Отправлен ответ на личное сообщение пользователю %s (%s)",
                  message.from_user.username, message.from_user.id)
+
+
+# Максимальная длина текста сообщения Telegram; более длинные отчёты отправляются файлом
+MAX_MESSAGE_LENGTH = 4096
+
+
+async def _send_bulk_report(message: types.Message, report: str):
+    """Отправляет отчёт о пакетной операции текстом или файлом, если он слишком длинный"""
+    if len(report) <= MAX_MESSAGE_LENGTH:
+        await message.answer(report)
+    else:
+        await message.answer_document(
+            BufferedInputFile(report.encode("utf-8"), filename="report.txt"),
+            caption="📄 Отчёт слишком длинный, отправляю файлом"
+        )
+
+
+async def _read_bulk_rows(message: types.Message):
+    """Читает строки пакетной операции из прикреплённого файла или из текста после команды"""
+    if message.document:
+        # Проверяем размер до скачивания, чтобы не загружать в память заведомо слишком большой файл
+        if (message.document.file_size or 0) > MAX_IMPORT_SIZE:
+            raise BulkParseError("файл слишком большой")
+        file = await message.bot.download(message.document)
+        return parse_document(file.read(), message.document.file_name)
+    text = message.text or message.caption or ""
+    parts = text.split(maxsplit=1)
+    return parse_text_rows(parts[1]) if len(parts) > 1 else []
+
+
+async def _run_bulk_operation(message: types.Message, remove: bool, usage: str):
+    """Общая логика пакетного добавления/удаления: проверка всех строк, затем одна запись файла"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав для выполнения этой команды")
+        return
+
+    try:
+        rows = await _read_bulk_rows(message)
+    except BulkParseError as e:
+        await message.answer(f"❌ Не удалось разобрать данные: {e}")
+        return
+
+    if not rows:
+        await message.answer(usage)
+        return
+
+    groups = load_groups()
+    rows, has_errors = validate_rows(rows, groups, remove=remove)
+    changes = collect_changes(rows)
+
+    # Не даём удалить всех администраторов — иначе первым админом станет случайный пользователь
+    remaining_admins = set(groups.get("admin_ids", [])) - set(changes["remove_admin_ids"])
+    if changes["remove_admin_ids"] and not remaining_admins:
+        await message.answer("❌ Нельзя удалить всех администраторов")
+        return
+
+    applied = False
+    if not has_errors and any(changes.values()):
+        if not apply_bulk_changes(**changes):
+            await message.answer("❌ Ошибка при сохранении изменений, ничего не применено")
+            return
+        applied = True
+    elif not has_errors:
+        # Изменений нет, но и ошибок нет — отчёт всё равно показываем
+        applied = True
+
+    logger.info("Пакетная операция (%s) от пользователя %s: %d строк, применено: %s",
+                "удаление" if remove else "добавление", message.from_user.id, len(rows), applied)
+    await _send_bulk_report(message, format_report(rows, applied))
+
+
+async def import_groups_handler(message: types.Message):
+    """Обработчик команды /import_groups для пакетного добавления групп и администраторов"""
+    await _run_bulk_operation(
+        message, remove=False,
+        usage="❌ Использование: /import_groups со списком строк '<id> <название>' "
+              "или с прикреплённым файлом .json/.csv/.txt"
+    )
+
+
+async def remove_groups_handler(message: types.Message):
+    """Обработчик команды /remove_groups для пакетного удаления групп и администраторов"""
+    await _run_bulk_operation(
+        message, remove=True,
+        usage="❌ Использование: /remove_groups со списком ID (по одному в строке) "
+              "или с прикреплённым файлом .json/.csv/.txt"
+    )
+
+
+async def export_groups_handler(message: types.Message):
+    """Обработчик команды /export_groups для выгрузки групп и администраторов файлом"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ У вас нет прав для выполнения этой команды")
+        return
+
+    args = message.text.split()
+    fmt = args[1].lower() if len(args) > 1 else "json"
+    if fmt not in ("json", "csv"):
+        await message.answer("❌ Использование: /export_groups [json|csv]")
+        return
+
+    groups = load_groups()
+    data = export_json(groups) if fmt == "json" else export_csv(groups)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    await message.answer_document(
+        BufferedInputFile(data, filename=f"groups_{timestamp}.{fmt}"),
+        caption=f"📦 Групп: {len(groups.get('group_chats', []))}, администраторов: {len(groups.get('admin_ids', []))}"
+    )
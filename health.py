@@ -0,0 +1,172 @@
+# health.py
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.methods import GetUpdates
+from aiohttp import web
+from config import (
+    HEALTH_HOST, HEALTH_PORT, HEALTH_MAX_HEARTBEAT_AGE, HEALTH_MAX_FETCH_AGE, HEALTH_MAX_LOOP_LAG,
+    HEALTH_MAX_POLL_AGE
+)
+from settings import load_settings
+
+logger = logging.getLogger(__name__)
+
+LAG_PROBE_INTERVAL = 1.0      # как часто измерять задержку цикла событий (секунды)
+MAX_MONITOR_ERRORS = 5        # сколько ошибок цикла мониторинга подряд считаются неисправностью
+
+STARTED_AT = time.time()
+
+# Состояние для проверок: отметки времени — time.time(), None — события ещё не было
+_state = {
+    "heartbeat": None,          # последний признак жизни цикла мониторинга
+    "last_fetch": None,         # последнее успешное получение цены
+    "last_broadcast": None,     # последняя успешная отправка уведомления или сводки
+    "monitor_errors": 0,        # ошибок цикла мониторинга подряд
+    "loop_lag": 0.0,            # последняя измеренная задержка цикла событий
+    "lag_measured_at": None,    # когда она измерена
+    "polling": "starting",      # состояние polling Telegram: starting / running / stopped
+    "last_poll": None,          # последний успешный запрос getUpdates
+}
+
+
+def beat():
+    """Отмечает, что цикл мониторинга жив"""
+    _state["heartbeat"] = time.time()
+
+
+def record_monitor_result(ok: bool):
+    """Учитывает результат итерации цикла мониторинга"""
+    _state["monitor_errors"] = 0 if ok else _state["monitor_errors"] + 1
+
+
+def record_fetch():
+    """Отмечает успешное получение цены"""
+    _state["last_fetch"] = time.time()
+
+
+def record_broadcast():
+    """Отмечает успешную отправку уведомления"""
+    _state["last_broadcast"] = time.time()
+
+
+def set_polling_status(status: str):
+    """Задаёт состояние polling Telegram"""
+    _state["polling"] = status
+    logger.info("Состояние polling: %s", status)
+
+
+class PollingMonitor(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: отмечает успешные запросы getUpdates.
+    aiogram при ошибках getUpdates не останавливает polling, а повторяет запрос, поэтому
+    одного состояния из startup/shutdown недостаточно — по возрасту отметки видно, что Telegram недоступен.
+    """
+
+    async def __call__(self, make_request, bot, method):
+        response = await make_request(bot, method)
+        if isinstance(method, GetUpdates):
+            _state["last_poll"] = time.time()
+        return response
+
+
+def _age(ts: Optional[float], now: float) -> Optional[float]:
+    return round(now - ts, 1) if ts is not None else None
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts is not None else None
+
+
+def get_status() -> dict:
+    """Собирает состояние бота и результаты проверок живости и готовности"""
+    now = time.time()
+    heartbeat_age = _age(_state["heartbeat"], now)
+    fetch_age = _age(_state["last_fetch"], now)
+    poll_age = _age(_state["last_poll"], now)
+    # Пока цикл мониторинга не отметился ни разу, отсчитываем от запуска процесса
+    effective_heartbeat_age = heartbeat_age if heartbeat_age is not None else now - STARTED_AT
+    lag_probe_age = _age(_state["lag_measured_at"], now)
+    # Между проверками цикл спит check_interval секунд: по умолчанию порог — два интервала, меньше он не бывает
+    settings = load_settings()
+    check_interval = settings.get("check_interval", 60) if settings else 60
+    max_heartbeat_age = max(HEALTH_MAX_HEARTBEAT_AGE, 2 * check_interval)
+
+    problems = []
+    if effective_heartbeat_age > max_heartbeat_age:
+        problems.append("monitor_heartbeat_stale")
+    if _state["monitor_errors"] >= MAX_MONITOR_ERRORS:
+        problems.append("monitor_failing")
+    if _state["loop_lag"] > HEALTH_MAX_LOOP_LAG:
+        problems.append("scheduler_lag")
+    if lag_probe_age is not None and lag_probe_age > HEALTH_MAX_LOOP_LAG + LAG_PROBE_INTERVAL:
+        problems.append("scheduler_stalled")
+    live = not problems
+
+    not_ready = list(problems)
+    if _state["polling"] != "running":
+        not_ready.append("polling_not_running")
+    elif poll_age is None or poll_age > HEALTH_MAX_POLL_AGE:
+        not_ready.append("polling_stale")
+    if fetch_age is None or fetch_age > HEALTH_MAX_FETCH_AGE:
+        not_ready.append("price_fetch_stale")
+
+    return {
+        "live": live,
+        "ready": not not_ready,
+        "problems": not_ready,
+        "uptime": round(now - STARTED_AT, 1),
+        "monitor": {
+            "heartbeat_age": heartbeat_age,
+            "consecutive_errors": _state["monitor_errors"],
+        },
+        "scheduler_lag": round(_state["loop_lag"], 3),
+        "last_fetch": _iso(_state["last_fetch"]),
+        "last_fetch_age": fetch_age,
+        "last_broadcast": _iso(_state["last_broadcast"]),
+        "last_broadcast_age": _age(_state["last_broadcast"], now),
+        "polling": _state["polling"],
+        "last_poll": _iso(_state["last_poll"]),
+        "last_poll_age": poll_age,
+    }
+
+
+async def healthz_handler(request: web.Request) -> web.Response:
+    """Живость: цикл мониторинга отмечается и не падает, цикл событий не тормозит"""
+    status = get_status()
+    return web.json_response(status, status=200 if status["live"] else 503)
+
+
+async def readyz_handler(request: web.Request) -> web.Response:
+    """Готовность: живость + polling запущен и getUpdates недавно успешен + цена недавно получена"""
+    status = get_status()
+    return web.json_response(status, status=200 if status["ready"] else 503)
+
+
+async def loop_lag_probe():
+    """Фоновая задача измерения задержки планировщика (цикла событий)"""
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        lag = time.monotonic() - started - LAG_PROBE_INTERVAL
+        _state["loop_lag"] = max(lag, 0.0)
+        _state["lag_measured_at"] = time.time()
+        if lag > HEALTH_MAX_LOOP_LAG:
+            logger.warning("Задержка цикла событий: %.2f с", lag)
+
+
+async def start_health_server() -> web.AppRunner:
+    """Запускает HTTP-сервер с /healthz и /readyz"""
+    app = web.Application()
+    app.router.add_get("/healthz", healthz_handler)
+    app.router.add_get("/readyz", readyz_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, HEALTH_HOST, HEALTH_PORT)
+    await site.start()
+    logger.info("Сервер проверок запущен на %s:%s", HEALTH_HOST, HEALTH_PORT)
+    return runner
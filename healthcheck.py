@@ -0,0 +1,35 @@
+# healthcheck.py
+"""
+Проверка живости для Docker HEALTHCHECK: python healthcheck.py [healthz|readyz]
+Код возврата 0 — бот здоров, 1 — нет. Не импортирует модули бота, чтобы проверка была быстрой.
+При HEALTH_PORT=0 сервер проверок не запускается, и проверка всегда успешна.
+"""
+import os
+import sys
+import urllib.error
+import urllib.request
+
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "8080"))
+TIMEOUT = float(os.getenv("HEALTHCHECK_TIMEOUT", "3"))
+
+
+def main() -> int:
+    if HEALTH_PORT == 0:
+        print("Сервер проверок отключён (HEALTH_PORT=0)")
+        return 0
+    endpoint = sys.argv[1] if len(sys.argv) > 1 else "healthz"
+    url = f"http://127.0.0.1:{HEALTH_PORT}/{endpoint}"
+    try:
+        with urllib.request.urlopen(url, timeout=TIMEOUT) as resp:
+            print(resp.read().decode("utf-8"))
+            return 0 if resp.status == 200 else 1
+    except urllib.error.HTTPError as e:
+        print(e.read().decode("utf-8", errors="replace"))
+        return 1
+    except Exception as e:
+        print(f"Проверка не удалась: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
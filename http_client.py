@@ -0,0 +1,28 @@
+# http_client.py
+import logging
+from typing import Optional
+
+import aiohttp
+from config import HTTP_CONNECTION_LIMIT
+
+logger = logging.getLogger(__name__)
+
+# Общая сессия для всех запросов к внешним API: одно соединение вместо сессии на каждый вызов
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Возвращает общую HTTP-сессию (создаётся при первом обращении)"""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=HTTP_CONNECTION_LIMIT))
+        logger.debug("Создана общая HTTP-сессия (лимит соединений %d)", HTTP_CONNECTION_LIMIT)
+    return _session
+
+
+async def close_session():
+    """Закрывает общую HTTP-сессию (вызывается при завершении бота)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
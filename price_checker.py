@@ -1,60 +1,48 @@
 # price_checker.py
-import aiohttp
 import asyncio
 import json
 import logging
 import os
 from datetime import datetime
-from typing import Optional, Dict
-import random
-# Список вариантов ответов для случая, когда цена выросла
-PRICE_UP_RESPONSE_TEMPLATES = [
-    """Ха! Цены растут, а значит, моя казна полнеет:  
-{currency_lines}
-Продолжайте в том же духе, крестьяне, и я буду… слегка доволен.""",
-
-    """Прекрасно! Ваши жалкие монеты сегодня стоят больше:  
-{currency_lines}
-Всё это, разумеется, работает на моё богатство.""",
-
-    """Видите, простолюдины? Даже рынок склоняется перед моей властью:  
-{currency_lines}
-Но не льстите себе — выгоду получу я, а не вы.""",
-
-    """Цены растут, и вместе с ними — моё настроение:  
-{currency_lines}
-Убедитесь, что разница окажется в королевской казне."""
-]
-# Список вариантов ответов для случая, когда цена упала
-PRICE_DOWN_RESPONSE_TEMPLATES = [
-    """Хм… цены упали. Кто-то из вас снова облажался:  
-{currency_lines}
-Надеюсь, вы компенсируете убытки… из своего кармана, разумеется.""",
-
-    """Падение цен? Прекрасно… для меня это лишь повод поднять налоги:  
-{currency_lines}
-Ваши потери — моя выгода. Таков порядок.""",
-
-    """Цены снизились? Пф, жалкие цифры не меняют сути:  
-{currency_lines}
-Вы всё равно должны мне прежнее количество золота.""",
-
-    """Упали цены? Значит, мне придётся вытрясти с вас ещё больше:  
-{currency_lines}
-Так что готовьтесь платить… и платить щедро."""
-]
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, List
 from aiogram import Bot
+from aiogram.types import FSInputFile
+from aiogram.exceptions import TelegramBadRequest
+from chat_health import deliver, classify_error, ERROR_OTHER
+from http_client import get_session
+from charts import get_chart, chart_photo, remember_file_id
 from config import (
-    COIN_ID, UP_IMAGE, DOWN_IMAGE
+    COIN_ID, UP_IMAGE, DOWN_IMAGE, PRICE_CACHE_TTL, DISPLAY_CURRENCIES
 )
-from settings import load_settings, load_groups, get_group_ids
-from utils import format_currency_lines
+from settings import load_settings, load_groups, get_group_ids, get_group_digest_windows, get_group_locales
+from digest import observe_price, record_trigger, DIGEST_CURRENCY
+from templates import normalize_locale, pick_variant, render_caption
+from fx import derive_prices
+import health
 
 
 logger = logging.getLogger(__name__)
 
 PRICE_FILE = "last_price.json"
-CURRENCIES = ["usd"]  # только USD
+CURRENCIES = ["usd"]  # запрашиваем только USD, остальные валюты пересчитываются по курсам (fx.py)
+WATCH_TTL = 3600         # сколько секунд обновлять цену монеты после последнего inline-запроса
+DEFAULT_URGENT_THRESHOLD = 5.0  # порог в %, выше которого группы в режиме сводки получают уведомление сразу
+ALERT_CHART_RANGE = "1d"  # диапазон графика в уведомлениях
+PRICE_BATCH_SIZE = 100   # сколько монет запрашивать в одном запросе /simple/price
+MAX_WATCHED_COINS = 2 * PRICE_BATCH_SIZE  # сколько монет обновлять в фоне (не больше 2 запросов за цикл)
+
+# Кэш цен процесса: {coin_id: {"prices": {"usd": float}, "ts": float}}
+_price_cache: Dict[str, dict] = {}
+# Монеты, цены которых нужно обновлять в фоне: {coin_id: время последнего запроса}.
+# LRU: при переполнении забываются монеты, которые запрашивали давнее всего
+_watched_coins: "OrderedDict[str, float]" = OrderedDict()
+_fetch_lock = asyncio.Lock()
+# Остановка цикла мониторинга: флаг остановки и признак того, что проверка сейчас не идёт
+_monitor_stop = asyncio.Event()
+_monitor_idle = asyncio.Event()
+_monitor_idle.set()
 
 
 def load_last_price() -> Optional[Dict[str, float]]:
@@ -84,32 +72,144 @@ def save_last_price(price: Dict[str, float]):
         logger.warning("Ошибка при сохранении цены в файл: %s", e)
 
 
-async def fetch_current_prices() -> Optional[Dict[str, float]]:
+async def fetch_prices(coin_ids: List[str], currencies: Optional[List[str]] = None) -> Optional[Dict[str, Dict[str, float]]]:
     """
-    Получает текущие цены через CoinGecko /simple/price.
-    Возвращает словарь вида {'usd': float} или None.
+    Получает цены сразу нескольких монет одним запросом CoinGecko /simple/price.
+    Возвращает словарь вида {coin_id: {'usd': float}} (только монеты со всеми валютами) или None.
+    Все полученные цены сохраняются в кэш.
     """
+    currencies = currencies or CURRENCIES
     url = "https://api.coingecko.com/api/v3/simple/price"
-    params = {"ids": COIN_ID, "vs_currencies": ",".join(CURRENCIES)}
+    params = {"ids": ",".join(coin_ids), "vs_currencies": ",".join(currencies)}
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params, timeout=10) as resp:
-                if resp.status != 200:
-                    logger.warning("API вернул статус %s", resp.status)
-                    return None
-                data = await resp.json()
-                coin = data.get(COIN_ID, {})
-                # Если чего-то нет — возвращаем None
-                if not all(c in coin for c in CURRENCIES):
-                    logger.warning("Не все валюты получены из API: %s", coin)
-                    return None
-                result = {c: float(coin[c]) for c in CURRENCIES}
-                logger.debug("Текущие цены получены: %s", result)
-                return result
+        session = get_session()
+        async with session.get(url, params=params, timeout=10) as resp:
+            if resp.status != 200:
+                logger.warning("API вернул статус %s", resp.status)
+                return None
+            data = await resp.json()
     except Exception as e:
         logger.warning("Ошибка при получении цен: %s", e)
         return None
 
+    result = {}
+    for coin_id in coin_ids:
+        coin = data.get(coin_id, {})
+        # Если чего-то нет — монету пропускаем
+        if not all(c in coin for c in currencies):
+            logger.warning("Не все валюты получены из API для %s: %s", coin_id, coin)
+            continue
+        result[coin_id] = {c: float(coin[c]) for c in currencies}
+        store_cached_prices(coin_id, result[coin_id])
+    logger.debug("Цены получены: %s", result)
+    return result
+
+
+async def fetch_current_prices() -> Optional[Dict[str, float]]:
+    """
+    Получает текущие цены COIN_ID через CoinGecko /simple/price.
+    Возвращает словарь вида {'usd': float} или None.
+    """
+    result = await fetch_prices([COIN_ID])
+    if not result or COIN_ID not in result:
+        return None
+    health.record_fetch()
+    logger.debug("Текущие цены получены: %s", result[COIN_ID])
+    return result[COIN_ID]
+
+
+def store_cached_prices(coin_id: str, prices: Dict[str, float]):
+    """Сохраняет цены монеты в кэш процесса"""
+    _price_cache[coin_id] = {"prices": prices, "ts": time.time()}
+
+
+def get_cached_prices(coin_id: str, max_age: Optional[float] = None) -> Optional[Dict[str, float]]:
+    """Возвращает цены монеты из кэша (или None, если их нет или они старше max_age секунд)"""
+    entry = _price_cache.get(coin_id)
+    if entry is None:
+        return None
+    if max_age is not None and time.time() - entry["ts"] > max_age:
+        return None
+    return entry["prices"]
+
+
+def watch_coins(coin_ids: List[str]):
+    """Отмечает монеты как запрошенные — их цены будут обновляться фоновой задачей"""
+    now = time.time()
+    for coin_id in coin_ids:
+        _watched_coins[coin_id] = now
+        _watched_coins.move_to_end(coin_id)
+    _trim_watched_coins()
+
+
+def _trim_watched_coins():
+    # Число фоновых запросов к API не зависит от разнообразия inline-запросов
+    while len(_watched_coins) > MAX_WATCHED_COINS:
+        _watched_coins.popitem(last=False)
+
+
+async def get_current_prices() -> Optional[Dict[str, float]]:
+    """
+    Возвращает цены COIN_ID из кэша, если они не старше PRICE_CACHE_TTL.
+    Иначе выполняет один запрос к API; одновременные вызовы ждут его результат.
+    """
+    cached = get_cached_prices(COIN_ID, PRICE_CACHE_TTL)
+    if cached is not None:
+        return cached
+    async with _fetch_lock:
+        # Пока ждали блокировку, цену мог обновить другой вызов
+        cached = get_cached_prices(COIN_ID, PRICE_CACHE_TTL)
+        if cached is not None:
+            return cached
+        return await fetch_current_prices()
+
+
+async def get_display_prices(prices: Dict[str, float], coin_id: str = COIN_ID) -> Dict[str, float]:
+    """
+    Дополняет цену в USD остальными валютами из DISPLAY_CURRENCIES.
+    Обычно пересчитывает по таблице курсов без запросов к API; если курсы устарели —
+    запрашивает прямые котировки (не чаще раза в PRICE_CACHE_TTL).
+    """
+    derived = derive_prices(prices)
+    if derived is not None:
+        return derived
+    cached = get_cached_prices(coin_id, PRICE_CACHE_TTL)
+    if cached is not None and all(c in cached for c in DISPLAY_CURRENCIES):
+        return cached
+    logger.warning("Курсы валют устарели, запрашиваем прямые котировки для %s", coin_id)
+    direct = await fetch_prices([coin_id], DISPLAY_CURRENCIES)
+    if direct and coin_id in direct:
+        return direct[coin_id]
+    return prices
+
+
+async def refresh_watched_prices():
+    """Обновляет цены монет, которые запрашивали за последние WATCH_TTL секунд"""
+    now = time.time()
+    for coin_id, requested_at in list(_watched_coins.items()):
+        if now - requested_at > WATCH_TTL:
+            del _watched_coins[coin_id]
+    # Цены монет, которые больше не запрашивают, не обновляются — убираем их из кэша (и снимка)
+    for coin_id in list(_price_cache):
+        if coin_id != COIN_ID and coin_id not in _watched_coins:
+            del _price_cache[coin_id]
+
+    # COIN_ID обновляет price_monitor_loop, здесь его не запрашиваем
+    coin_ids = [coin_id for coin_id in _watched_coins if coin_id != COIN_ID]
+    for start in range(0, len(coin_ids), PRICE_BATCH_SIZE):
+        await fetch_prices(coin_ids[start:start + PRICE_BATCH_SIZE])
+
+
+async def price_cache_refresh_loop():
+    """Фоновая задача обновления кэша цен для монет из inline-запросов"""
+    logger.info("Начало цикла обновления кэша цен")
+    while True:
+        try:
+            await refresh_watched_prices()
+        except Exception as e:
+            logger.error("Ошибка в price_cache_refresh_loop: %s", e)
+        await asyncio.sleep(PRICE_CACHE_TTL)
+
 
 async def check_price_and_notify(bot: Bot):
     """
@@ -128,6 +228,10 @@ async def check_price_and_notify(bot: Bot):
         logger.warning("Не удалось получить текущие цены")
         return
 
+    # Открытые сводки обновляют закрытие, максимум и минимум на каждом тике
+    if DIGEST_CURRENCY in current:
+        observe_price(current[DIGEST_CURRENCY])
+
     # Если нет сохранённой прошлой цены — просто сохраним и уйдём
     if not last:
         logger.info("Нет сохраненной цены, сохраняем текущую как базовую")
@@ -165,33 +269,26 @@ async def check_price_and_notify(bot: Bot):
     trigger_currency = max(triggers.keys(), key=lambda k: abs(triggers[k]))
     trigger_percent = triggers[trigger_currency]
 
-    # Выберем картинку по знаку изменения
+    # Выберем картинку по знаку изменения (используется, если график построить не удалось)
     img_path = UP_IMAGE if trigger_percent > 0 else DOWN_IMAGE
 
-    # Сформируем текст сообщения — показываем все 3 валюты (старое -> новое и процент)
-    lines = []
-    emoji_map = {"usd": ""}
-    for c in CURRENCIES:
-        old = last.get(c)
-        new = current.get(c)
-        if old is None:
-            line = f"{c.upper()}: — → {new:.4f}"
-        else:
-            pct = ((new - old) / old) * 100 if old != 0 else 0.0
-            sign = "+" if pct > 0 else ""
-            line = f"{c.upper()}: {old:.4f} → {new:.4f} ({sign}{pct:.2f}%)"
-        lines.append(line)
-
-    # Если цена выросла, используем случайный шаблон ответа
-    if trigger_percent > 0:
-        template = random.choice(PRICE_UP_RESPONSE_TEMPLATES)
-        currency_lines = "\n".join(lines)
-        caption = template.format(currency_lines=currency_lines)
-    else:
-        # Если цена упала, используем случайный шаблон ответа
-        template = random.choice(PRICE_DOWN_RESPONSE_TEMPLATES)
-        currency_lines = "\n".join(lines)
-        caption = template.format(currency_lines=currency_lines)
+    # Сформируем текст сообщения — показываем все валюты (старое -> новое и процент)
+    # Старую цену пересчитываем по той же таблице курсов, что и новую
+    display_current = await get_display_prices(current)
+    display_last = derive_prices(last) or last
+
+    # Шаблон зависит от направления; вариант выбирается один раз на рассылку для каждой локали,
+    # поэтому подпись рендерится один раз на локаль, а остальные группы получают её из кэша
+    family = "price_up" if trigger_percent > 0 else "price_down"
+    group_locales = get_group_locales()
+    captions = {}
+
+    def caption_for(chat_id: int) -> str:
+        locale = normalize_locale(group_locales.get(chat_id))
+        if locale not in captions:
+            captions[locale] = render_caption(family, locale, display_current, display_last,
+                                              pick_variant(family, locale))
+        return captions[locale]
 
     # Отправляем уведомления во все группы
     logger.info("Получение списка групп для отправки уведомлений")
@@ -204,29 +301,76 @@ async def check_price_and_notify(bot: Bot):
         logger.info("Группы не настроены, используем группу по умолчанию: %s", GROUP_CHAT_ID)
     else:
         logger.info("Используем все зарегистрированные группы: %s", group_ids)
-    
+
+    # Группы в режиме сводки получают уведомление сразу только при срочном изменении
+    digest_windows = get_group_digest_windows()
+    if digest_windows:
+        urgent_threshold = settings.get("urgent_threshold", DEFAULT_URGENT_THRESHOLD) if settings else DEFAULT_URGENT_THRESHOLD
+        is_urgent = abs(trigger_percent) >= urgent_threshold
+        old_price, new_price = last.get(DIGEST_CURRENCY), current.get(DIGEST_CURRENCY)
+        for group_id in group_ids:
+            if group_id in digest_windows and old_price is not None and new_price is not None:
+                record_trigger(group_id, digest_windows[group_id], old_price, new_price)
+        if not is_urgent:
+            group_ids = [group_id for group_id in group_ids if group_id not in digest_windows]
+            logger.info("Изменение не срочное (порог %.2f%%), группы в режиме сводки пропущены", urgent_threshold)
+
+    if not group_ids:
+        logger.info("Нет групп для немедленной отправки уведомления")
+        logger.info("✅ ПОРОГ СРАБОТАЛ - сохраняем новую цену как базовую")
+        save_last_price(current)
+        logger.info("=== КОНЕЦ ПРОВЕРКИ (с сохранением новой базовой цены) ===")
+        return
+
+    # График строится один раз за тик и отправляется во все группы; после первой загрузки — по file_id
+    chart = await get_chart(COIN_ID, ALERT_CHART_RANGE)
+
+    async def send_static(chat_id: int, caption: str):
+        if os.path.exists(img_path):
+            # Проверяем, что файл изображения не пустой
+            if os.path.getsize(img_path) > 0:
+                await bot.send_photo(chat_id=chat_id, photo=FSInputFile(img_path), caption=caption)
+                logger.info("Уведомление с изображением отправлено в группу %s", chat_id)
+            else:
+                logger.warning("Файл изображения пустой: %s", img_path)
+                await bot.send_message(chat_id=chat_id, text=caption)
+                logger.info("Уведомление без изображения отправлено в группу %s", chat_id)
+        else:
+            logger.warning("Файл изображения не найден: %s", img_path)
+            await bot.send_message(chat_id=chat_id, text=caption)
+            logger.info("Уведомление без изображения отправлено в группу %s", chat_id)
+
+    async def send_alert(chat_id: int):
+        nonlocal chart
+        logger.info("Отправка уведомления в группу %s", chat_id)
+        caption = caption_for(chat_id)
+        if chart is not None:
+            try:
+                sent = await bot.send_photo(chat_id=chat_id, photo=chart_photo(chart), caption=caption)
+                remember_file_id(chart, sent)
+                logger.info("Уведомление с графиком отправлено в группу %s", chat_id)
+                return
+            except TelegramBadRequest as e:
+                # Недоступность чата, миграцию и flood control обрабатывает deliver
+                if classify_error(e) != ERROR_OTHER:
+                    raise
+                logger.warning("Не удалось отправить график в группу %s: %s", chat_id, e)
+                if chart["png"] is None:
+                    # Восстановленный из снимка file_id отклонён, загрузить заново нечего
+                    chart = None
+        await send_static(chat_id, caption)
+
     logger.info("Начало отправки уведомлений в %d групп(ы)", len(group_ids))
+    delivered = 0
     for group_id in group_ids:
-        try:
-            logger.info("Отправка уведомления в группу %s", group_id)
-            if os.path.exists(img_path):
-                # Проверяем, что файл изображения не пустой
-                if os.path.getsize(img_path) > 0:
-                    with open(img_path, "rb") as ph:
-                        await bot.send_photo(chat_id=group_id, photo=ph, caption=caption)
-                        logger.info("Уведомление с изображением отправлено в группу %s", group_id)
-                else:
-                    logger.warning("Файл изображения пустой: %s", img_path)
-                    await bot.send_message(chat_id=group_id, text=caption)
-                    logger.info("Уведомление без изображения отправлено в группу %s", group_id)
-            else:
-                logger.warning("Файл изображения не найден: %s", img_path)
-                await bot.send_message(chat_id=group_id, text=caption)
-                logger.info("Уведомление без изображения отправлено в группу %s", group_id)
-        except Exception as e:
-            # Не падаем при ошибке отправки — просто логируем в консоль
-            logger.error("Ошибка при отправке уведомления в группу %s: %s", group_id, e)
-    logger.info("Завершена отправка уведомлений в %d групп(ы)", len(group_ids))
+        # Ошибки классифицируются в chat_health: недоступные чаты отключаются, перенесённые получают новый ID
+        if await deliver(bot, group_id, send_alert) is not None:
+            delivered += 1
+        # Долгая рассылка — тоже признак жизни цикла мониторинга
+        health.beat()
+    if delivered:
+        health.record_broadcast()
+    logger.info("Завершена отправка уведомлений: доставлено в %d из %d групп(ы)", delivered, len(group_ids))
 
     # ИСПРАВЛЕНИЕ: Сохраняем новую цену ТОЛЬКО после отправки уведомления
     logger.info("✅ ПОРОГ СРАБОТАЛ - сохраняем новую цену как базовую")
@@ -237,15 +381,56 @@ async def check_price_and_notify(bot: Bot):
 # Небольшая обёртка для фонового запуска (используется в bot.py)
 async def price_monitor_loop(bot: Bot):
     logger.info("Начало цикла мониторинга цен")
-    while True:
+    while not _monitor_stop.is_set():
+        _monitor_idle.clear()
+        health.beat()
         try:
             await check_price_and_notify(bot)
+            health.record_monitor_result(True)
         except Exception as e:
             logger.error("Ошибка в price_monitor_loop: %s", e)
+            health.record_monitor_result(False)
+        finally:
+            health.beat()
+            _monitor_idle.set()
         
         # Загружаем интервал проверки из настроек
         settings = load_settings()
         check_interval = settings.get("check_interval", 60) if settings else 60
         
         logger.debug("Ожидание следующей итерации мониторинга")
-        await asyncio.sleep(check_interval)
+        try:
+            await asyncio.wait_for(_monitor_stop.wait(), timeout=check_interval)
+        except asyncio.TimeoutError:
+            pass
+    logger.info("Цикл мониторинга цен остановлен")
+
+
+async def stop_price_monitor(timeout: float) -> bool:
+    """
+    Просит цикл мониторинга остановиться и ждёт окончания текущей проверки не дольше timeout,
+    чтобы не прерывать рассылку на середине.
+    """
+    _monitor_stop.set()
+    try:
+        await asyncio.wait_for(_monitor_idle.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        logger.warning("Проверка цены не завершилась за %.0f с и будет отменена", timeout)
+        return False
+
+
+def export_state() -> dict:
+    """Состояние кэша цен для снимка (state_snapshot.py)"""
+    return {"price_cache": _price_cache, "watched_coins": _watched_coins}
+
+
+def restore_state(state: dict):
+    """Восстанавливает кэш цен из снимка"""
+    for coin_id, entry in state.get("price_cache", {}).items():
+        _price_cache[coin_id] = {"prices": {c: float(v) for c, v in entry["prices"].items()}, "ts": float(entry["ts"])}
+    watched = sorted(state.get("watched_coins", {}).items(), key=lambda item: float(item[1]))
+    for coin_id, requested_at in watched:
+        _watched_coins[coin_id] = float(requested_at)
+        _watched_coins.move_to_end(coin_id)
+    _trim_watched_coins()
@@ -8,6 +8,10 @@ logger = logging.getLogger(__name__)
 SETTINGS_FILE = "settings.json"
 GROUPS_FILE = "groups.json"
 
+# Разобранные данные groups.json для частых чтений (рассылка, /price): пересчитываются,
+# только когда файл меняется (сравниваются время изменения и размер) или после save_groups
+_groups_view = None
+
 
 def load_settings():
     """Загружает настройки из файла settings.json"""
@@ -77,15 +81,48 @@ def load_groups():
         return default_groups
 
 
+def _groups_file_stamp():
+    try:
+        stat = os.stat(GROUPS_FILE)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+def _build_groups_view(groups, stamp):
+    chats = groups.get("group_chats", []) if groups else []
+    return {
+        "stamp": stamp,
+        "ids": [group["id"] for group in chats],
+        "locales": {group["id"]: group["locale"] for group in chats if group.get("locale")},
+        "digest_windows": {
+            group["id"]: int(group["digest_window"]) for group in chats if group.get("digest_window")
+        }
+    }
+
+
+def _get_groups_view():
+    """Возвращает разобранные данные групп, перечитывая groups.json только при его изменении"""
+    global _groups_view
+    stamp = _groups_file_stamp()
+    if _groups_view is None or _groups_view["stamp"] != stamp:
+        _groups_view = _build_groups_view(load_groups(), stamp)
+    return _groups_view
+
+
 def save_groups(groups):
     """Сохраняет информацию о группах в файл groups.json"""
+    global _groups_view
     try:
         logger.debug("Сохранение групп в файл: %s", groups)
         with open(GROUPS_FILE, "w", encoding="utf-8") as f:
             json.dump(groups, f, indent=2, ensure_ascii=False)
+        _groups_view = _build_groups_view(groups, _groups_file_stamp())
         logger.debug("Группы успешно сохранены в файл: %s", GROUPS_FILE)
+        return True
     except Exception as e:
         logger.warning("Ошибка при сохранении групп: %s", e)
+        return False
 
 
 def is_admin(user_id):
@@ -189,15 +226,145 @@ def remove_group(group_id):
 
 def get_group_ids():
     """Возвращает список ID всех групп"""
+    try:
+        group_ids = list(_get_groups_view()["ids"])
+        logger.debug("Список ID групп: %s", group_ids)
+        return group_ids
+    except Exception as e:
+        logger.error("Ошибка при получении списка групп: %s", e)
+        return []
+
+def replace_group_id(old_id, new_id):
+    """Заменяет ID группы (например, после миграции группы в супергруппу)"""
     try:
         groups = load_groups()
-        logger.debug("Загруженные группы: %s", groups)
-        if groups and "group_chats" in groups:
-            group_ids = [group["id"] for group in groups["group_chats"]]
-            logger.debug("Список ID групп: %s", group_ids)
-            return group_ids
-        logger.debug("Группы не найдены")
+        if not groups or "group_chats" not in groups:
+            return False
+
+        if any(group["id"] == new_id for group in groups["group_chats"]):
+            # Новый ID уже есть в списке — достаточно удалить старую запись
+            logger.info("Группа с ID=%s уже существует, удаляем старую запись %s", new_id, old_id)
+            return remove_group(old_id)
+
+        for group in groups["group_chats"]:
+            if group["id"] == old_id:
+                group["id"] = new_id
+                save_groups(groups)
+                logger.info("ID группы обновлен: %s -> %s", old_id, new_id)
+                return True
+        return False
+    except Exception as e:
+        logger.error("Ошибка при замене ID группы: %s", e)
+        return False
+
+
+def remove_groups(group_ids):
+    """Удаляет несколько групп за одну запись файла. Возвращает список удаленных ID"""
+    try:
+        groups = load_groups()
+        if not groups or "group_chats" not in groups:
+            return []
+
+        to_remove = set(group_ids)
+        removed = [group["id"] for group in groups["group_chats"] if group["id"] in to_remove]
+        if removed:
+            groups["group_chats"] = [group for group in groups["group_chats"] if group["id"] not in to_remove]
+            save_groups(groups)
+            logger.info("Удалены группы: %s", removed)
+        return removed
+    except Exception as e:
+        logger.error("Ошибка при удалении групп: %s", e)
         return []
+
+
+def apply_bulk_changes(add_groups=(), remove_group_ids=(), add_admin_ids=(), remove_admin_ids=()):
+    """Применяет пакет изменений групп и администраторов за одну запись файла"""
+    try:
+        groups = load_groups()
+        if not groups:
+            groups = {"admin_ids": [], "group_chats": []}
+        groups.setdefault("admin_ids", [])
+        groups.setdefault("group_chats", [])
+
+        to_remove = set(remove_group_ids)
+        group_chats = [group for group in groups["group_chats"] if group["id"] not in to_remove]
+        existing_ids = {group["id"] for group in group_chats}
+        for group in add_groups:
+            if group["id"] not in existing_ids:
+                group_chats.append({"id": group["id"], "name": group["name"]})
+                existing_ids.add(group["id"])
+
+        admins_to_remove = set(remove_admin_ids)
+        admin_ids = [admin_id for admin_id in groups["admin_ids"] if admin_id not in admins_to_remove]
+        for admin_id in add_admin_ids:
+            if admin_id not in admin_ids:
+                admin_ids.append(admin_id)
+
+        groups["group_chats"] = group_chats
+        groups["admin_ids"] = admin_ids
+        if not save_groups(groups):
+            return False
+        logger.info("Пакетные изменения применены: +%d/-%d групп, +%d/-%d администраторов",
+                    len(add_groups), len(remove_group_ids), len(add_admin_ids), len(remove_admin_ids))
+        return True
     except Exception as e:
-        logger.error("Ошибка при получении списка групп: %s", e)
-        return []
\ No newline at end of file
+        logger.error("Ошибка при пакетном изменении групп: %s", e)
+        return False
+
+
+def get_group_digest_windows():
+    """Возвращает окна сводок групп в секундах: {group_id: window} (только группы в режиме сводки)"""
+    try:
+        return dict(_get_groups_view()["digest_windows"])
+    except Exception as e:
+        logger.error("Ошибка при получении настроек сводок: %s", e)
+        return {}
+
+
+def set_group_digest(group_id, window):
+    """Включает режим сводки для группы (window — окно в секундах) или выключает его (window = 0)"""
+    try:
+        groups = load_groups()
+        for group in groups.get("group_chats", []):
+            if group["id"] == group_id:
+                if window:
+                    group["digest_window"] = window
+                else:
+                    group.pop("digest_window", None)
+                return save_groups(groups)
+        return False
+    except Exception as e:
+        logger.error("Ошибка при изменении режима сводки: %s", e)
+        return False
+
+
+def get_group_locales():
+    """Возвращает локали групп: {group_id: locale} (только группы с заданной локалью)"""
+    try:
+        return dict(_get_groups_view()["locales"])
+    except Exception as e:
+        logger.error("Ошибка при получении локалей групп: %s", e)
+        return {}
+
+
+def get_group_locale(group_id, default=None):
+    """Возвращает локаль одной группы (или default, если она не задана)"""
+    try:
+        return _get_groups_view()["locales"].get(group_id, default)
+    except Exception as e:
+        logger.error("Ошибка при получении локали группы: %s", e)
+        return default
+
+
+def set_group_locale(group_id, locale):
+    """Задаёт локаль сообщений группы"""
+    try:
+        groups = load_groups()
+        for group in groups.get("group_chats", []):
+            if group["id"] == group_id:
+                group["locale"] = locale
+                return save_groups(groups)
+        return False
+    except Exception as e:
+        logger.error("Ошибка при изменении локали группы: %s", e)
+        return False
@@ -0,0 +1,131 @@
+# state_snapshot.py
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+import charts
+import chat_health
+import coin_index
+import digest
+import fx
+import price_checker
+from config import SNAPSHOT_INTERVAL, STATE_FILE
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+MAX_SNAPSHOT_AGE = 86400  # снимки старше суток не восстанавливаются
+
+# Разделы снимка: имя -> модуль с функциями export_state() и restore_state(state)
+SECTIONS = {
+    "prices": price_checker,
+    "fx": fx,
+    "coin_index": coin_index,
+    "digest": digest,
+    "chat_health": chat_health,
+    "charts": charts,
+}
+
+# Время запуска процесса — от него считается время до первого ответа
+STARTED_AT = time.monotonic()
+_first_response_logged = False
+
+
+def save_snapshot(path: str = STATE_FILE) -> bool:
+    """Сохраняет состояние всех разделов в один файл (атомарно, через временный файл)"""
+    started = time.perf_counter()
+    sections = {}
+    for name, module in SECTIONS.items():
+        try:
+            sections[name] = module.export_state()
+        except Exception as e:
+            logger.error("Ошибка при сохранении раздела снимка %s: %s", name, e)
+
+    snapshot = {"version": SCHEMA_VERSION, "saved_at": time.time(), "sections": sections}
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning("Ошибка при сохранении снимка состояния: %s", e)
+        return False
+
+    logger.info("Снимок состояния сохранён за %.3f с (%d байт)",
+                time.perf_counter() - started, os.path.getsize(path))
+    return True
+
+
+def _read_snapshot(path: str) -> Optional[dict]:
+    if not os.path.exists(path):
+        logger.info("Снимок состояния не найден, запуск с пустым состоянием")
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except Exception as e:
+        logger.warning("Ошибка при чтении снимка состояния: %s", e)
+        return None
+
+    if not isinstance(snapshot, dict) or not isinstance(snapshot.get("sections"), dict):
+        logger.warning("Снимок состояния имеет неверный формат, пропускаем")
+        return None
+    if snapshot.get("version") != SCHEMA_VERSION:
+        logger.warning("Версия снимка %s не совпадает с %s, пропускаем",
+                       snapshot.get("version"), SCHEMA_VERSION)
+        return None
+    saved_at = snapshot.get("saved_at")
+    if isinstance(saved_at, bool) or not isinstance(saved_at, (int, float)):
+        logger.warning("В снимке состояния нет корректного времени сохранения, пропускаем")
+        return None
+    age = time.time() - saved_at
+    if age > MAX_SNAPSHOT_AGE:
+        logger.warning("Снимок состояния устарел (%.0f с), пропускаем", age)
+        return None
+    return snapshot
+
+
+def restore_snapshot(path: str = STATE_FILE) -> bool:
+    """Восстанавливает состояние из снимка; повреждённые разделы пропускаются"""
+    started = time.perf_counter()
+    snapshot = _read_snapshot(path)
+    if snapshot is None:
+        return False
+
+    restored = []
+    for name, module in SECTIONS.items():
+        state = snapshot["sections"].get(name)
+        if not isinstance(state, dict):
+            continue
+        try:
+            module.restore_state(state)
+            restored.append(name)
+        except Exception as e:
+            logger.warning("Раздел снимка %s повреждён, пропускаем: %s", name, e)
+
+    logger.info("Состояние восстановлено за %.3f с, разделы: %s",
+                time.perf_counter() - started, ", ".join(restored) or "нет")
+    return True
+
+
+def mark_first_response():
+    """Логирует время от запуска процесса до первого ответа пользователю (один раз)"""
+    global _first_response_logged
+    if _first_response_logged:
+        return
+    _first_response_logged = True
+    logger.info("Время до первого ответа после запуска: %.3f с", time.monotonic() - STARTED_AT)
+
+
+async def snapshot_loop():
+    """Фоновая задача периодического сохранения снимка"""
+    logger.info("Начало цикла сохранения снимков состояния")
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            save_snapshot()
+        except Exception as e:
+            logger.error("Ошибка в snapshot_loop: %s", e)
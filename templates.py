@@ -0,0 +1,277 @@
+# templates.py
+import logging
+import random
+from collections import OrderedDict
+from string import Formatter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import DISPLAY_CURRENCIES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCALE = "ru"
+CACHE_SIZE = 512  # сколько отрендеренных подписей и строк курсов хранить
+
+# Список вариантов ответов для команды /price
+PRICE_RESPONSE_TEMPLATES = [
+    """Ах, курс валют. Золото меркнет перед точными цифрами. Запомните:  
+{currency_lines}
+Теперь идите и используйте их с умом… во благо моей казны.""",
+
+    """Простолюдины, внимайте! Сегодня мои казначеи установили следующие курсы:  
+{currency_lines}
+Любая прибыль с обмена — в королевскую казну, разумеется.""",
+
+    """Запишите, крестьяне, дабы не тратить моё время на расспросы:  
+{currency_lines}
+И помните — ваши монеты уже мысленно принадлежат мне.""",
+
+    """Казна требует точности! Сегодняшние курсы:  
+{currency_lines}
+Любая выгода с обмена — моя. Даже не думайте иначе."""
+]
+# Список вариантов ответов для случая, когда цена выросла
+PRICE_UP_RESPONSE_TEMPLATES = [
+    """Ха! Цены растут, а значит, моя казна полнеет:  
+{currency_lines}
+Продолжайте в том же духе, крестьяне, и я буду… слегка доволен.""",
+
+    """Прекрасно! Ваши жалкие монеты сегодня стоят больше:  
+{currency_lines}
+Всё это, разумеется, работает на моё богатство.""",
+
+    """Видите, простолюдины? Даже рынок склоняется перед моей властью:  
+{currency_lines}
+Но не льстите себе — выгоду получу я, а не вы.""",
+
+    """Цены растут, и вместе с ними — моё настроение:  
+{currency_lines}
+Убедитесь, что разница окажется в королевской казне."""
+]
+# Список вариантов ответов для случая, когда цена упала
+PRICE_DOWN_RESPONSE_TEMPLATES = [
+    """Хм… цены упали. Кто-то из вас снова облажался:  
+{currency_lines}
+Надеюсь, вы компенсируете убытки… из своего кармана, разумеется.""",
+
+    """Падение цен? Прекрасно… для меня это лишь повод поднять налоги:  
+{currency_lines}
+Ваши потери — моя выгода. Таков порядок.""",
+
+    """Цены снизились? Пф, жалкие цифры не меняют сути:  
+{currency_lines}
+Вы всё равно должны мне прежнее количество золота.""",
+
+    """Упали цены? Значит, мне придётся вытрясти с вас ещё больше:  
+{currency_lines}
+Так что готовьтесь платить… и платить щедро."""
+]
+# Список вариантов ответов при ошибке получения курса
+PRICE_ERROR_TEMPLATES = [
+    "❌ Даже мои казначеи не смогли добыть данные о курсе. Вернитесь, когда они перестанут бездельничать.",
+    "❌ Курс недоступен. Видимо, ваши жалкие рынки сегодня спят. Попробуйте позже.",
+    "❌ Не удалось узнать курс. Моё терпение ограничено, так что приходите, когда будет информация."
+]
+
+# Английские варианты для групп с locale = "en"
+PRICE_RESPONSE_TEMPLATES_EN = [
+    """Ah, exchange rates. Gold pales before precise numbers. Remember them:  
+{currency_lines}
+Now go and use them wisely… for the good of my treasury.""",
+
+    """Commoners, hearken! Today my treasurers have set the following rates:  
+{currency_lines}
+Any profit from the exchange goes to the royal treasury, of course."""
+]
+PRICE_UP_RESPONSE_TEMPLATES_EN = [
+    """Ha! Prices are rising, and so is my treasury:  
+{currency_lines}
+Keep it up, peasants, and I shall be… mildly pleased.""",
+
+    """Splendid! Your pitiful coins are worth more today:  
+{currency_lines}
+All of it serves my wealth, naturally."""
+]
+PRICE_DOWN_RESPONSE_TEMPLATES_EN = [
+    """Hmm… prices fell. One of you has failed again:  
+{currency_lines}
+I trust you will cover the losses… out of your own pocket.""",
+
+    """Prices dropped? Pitiful numbers change nothing:  
+{currency_lines}
+You still owe me the same amount of gold."""
+]
+PRICE_ERROR_TEMPLATES_EN = [
+    "❌ Even my treasurers could not obtain the rate. Come back when they stop idling.",
+    "❌ The rate is unavailable. Your wretched markets must be asleep. Try again later."
+]
+
+# Сводка для групп в режиме сводки (digest.py)
+DIGEST_TEMPLATES = ["""📜 Сводка казначейства за {start} — {end}:
+Открытие: {open}
+Закрытие: {close} ({change})
+Максимум: {high}
+Минимум: {low}
+Пересечений порога: {crossings}
+Записывайте, крестьяне. Повторять не буду."""]
+DIGEST_TEMPLATES_EN = ["""📜 Treasury summary for {start} — {end}:
+Open: {open}
+Close: {close} ({change})
+High: {high}
+Low: {low}
+Threshold crossings: {crossings}
+Write it down, peasants. I shall not repeat myself."""]
+
+# Ответы команды /chart
+CHART_CAPTION_TEMPLATES = ["📈 {coin} за {range}"]
+CHART_CAPTION_TEMPLATES_EN = ["📈 {coin} over {range}"]
+CHART_USAGE_TEMPLATES = ["❌ Использование: /chart [{ranges}]"]
+CHART_USAGE_TEMPLATES_EN = ["❌ Usage: /chart [{ranges}]"]
+CHART_ERROR_TEMPLATES = ["❌ Мои художники не смогли нарисовать график. Попробуйте позже."]
+CHART_ERROR_TEMPLATES_EN = ["❌ My painters failed to draw the chart. Try again later."]
+
+# Карточки inline-режима
+INLINE_PRICE_TEMPLATES = ["💰 {title}\n{currency_lines}"]
+INLINE_LOADING_TEMPLATES = ["⏳ Курс загружается, повторите запрос через минуту"]
+INLINE_LOADING_TEMPLATES_EN = ["⏳ The rate is loading, try again in a minute"]
+
+# Семейства шаблонов: {семейство: {locale: [варианты]}}
+TEMPLATE_FAMILIES = {
+    "price": {"ru": PRICE_RESPONSE_TEMPLATES, "en": PRICE_RESPONSE_TEMPLATES_EN},
+    "price_up": {"ru": PRICE_UP_RESPONSE_TEMPLATES, "en": PRICE_UP_RESPONSE_TEMPLATES_EN},
+    "price_down": {"ru": PRICE_DOWN_RESPONSE_TEMPLATES, "en": PRICE_DOWN_RESPONSE_TEMPLATES_EN},
+    "price_error": {"ru": PRICE_ERROR_TEMPLATES, "en": PRICE_ERROR_TEMPLATES_EN},
+    "digest": {"ru": DIGEST_TEMPLATES, "en": DIGEST_TEMPLATES_EN},
+    "chart_caption": {"ru": CHART_CAPTION_TEMPLATES, "en": CHART_CAPTION_TEMPLATES_EN},
+    "chart_usage": {"ru": CHART_USAGE_TEMPLATES, "en": CHART_USAGE_TEMPLATES_EN},
+    "chart_error": {"ru": CHART_ERROR_TEMPLATES, "en": CHART_ERROR_TEMPLATES_EN},
+    "inline_price": {"ru": INLINE_PRICE_TEMPLATES, "en": INLINE_PRICE_TEMPLATES},
+    "inline_loading": {"ru": INLINE_LOADING_TEMPLATES, "en": INLINE_LOADING_TEMPLATES_EN},
+}
+LOCALES = tuple(TEMPLATE_FAMILIES["price"])
+
+
+class CompiledTemplate(NamedTuple):
+    """Шаблон, заранее разобранный на текстовые части и имена подстановок"""
+    literals: Tuple[str, ...]
+    fields: Tuple[Optional[str], ...]
+
+    def render(self, values: Dict[str, str]) -> str:
+        parts = []
+        for literal, field in zip(self.literals, self.fields):
+            parts.append(literal)
+            if field is not None:
+                parts.append(values[field])
+        return "".join(parts)
+
+
+def compile_template(text: str) -> CompiledTemplate:
+    """Разбирает шаблон str.format один раз; поддерживаются только именованные подстановки без формата"""
+    literals, fields = [], []
+    for literal, field, spec, conversion in Formatter().parse(text):
+        if field is not None and (not field or spec or conversion):
+            raise ValueError(f"Неподдерживаемая подстановка в шаблоне: {{{field}}}")
+        literals.append(literal)
+        fields.append(field)
+    return CompiledTemplate(tuple(literals), tuple(fields))
+
+
+_compiled: Dict[str, Dict[str, List[CompiledTemplate]]] = {
+    family: {locale: [compile_template(text) for text in variants] for locale, variants in locales.items()}
+    for family, locales in TEMPLATE_FAMILIES.items()
+}
+_lines_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_caption_cache: "OrderedDict[tuple, str]" = OrderedDict()
+
+
+def _cache_get(cache: OrderedDict, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache: OrderedDict, key, value):
+    cache[key] = value
+    if len(cache) > CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def normalize_locale(locale: Optional[str]) -> str:
+    """Возвращает поддерживаемую локаль (по умолчанию DEFAULT_LOCALE)"""
+    return locale if locale in LOCALES else DEFAULT_LOCALE
+
+
+def price_snapshot(current: Dict[str, float], last: Optional[Dict[str, float]] = None) -> tuple:
+    """Ключ снимка цен для кэша: режим (текущий курс или изменение) и значения по валютам"""
+    if last is None:
+        return ("plain",) + tuple((c, current.get(c)) for c in DISPLAY_CURRENCIES)
+    currencies = [c for c in DISPLAY_CURRENCIES if c in current] or list(current)
+    return ("change",) + tuple((c, current[c], last.get(c)) for c in currencies)
+
+
+def _render_lines(current: Dict[str, float], last: Optional[Dict[str, float]]) -> str:
+    lines = []
+    if last is None:
+        # Текущий курс: все валюты из DISPLAY_CURRENCIES, недоступные — прочерком
+        for c in DISPLAY_CURRENCIES:
+            price = current.get(c)
+            lines.append(f"{c.upper()}: {price:.4f}" if price is not None else f"{c.upper()}: —")
+        return "\n".join(lines)
+
+    # Изменение курса: старое -> новое и процент
+    for c in [c for c in DISPLAY_CURRENCIES if c in current] or list(current):
+        old = last.get(c)
+        new = current[c]
+        if old is None:
+            line = f"{c.upper()}: — → {new:.4f}"
+        else:
+            pct = ((new - old) / old) * 100 if old != 0 else 0.0
+            sign = "+" if pct > 0 else ""
+            line = f"{c.upper()}: {old:.4f} → {new:.4f} ({sign}{pct:.2f}%)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def render_currency_lines(current: Dict[str, float], last: Optional[Dict[str, float]] = None) -> str:
+    """
+    Строки с курсами валют. Без last — текущий курс, с last — изменение курса.
+    Результат кэшируется по снимку цен.
+    """
+    key = price_snapshot(current, last)
+    lines = _cache_get(_lines_cache, key)
+    if lines is None:
+        lines = _render_lines(current, last)
+        _cache_put(_lines_cache, key, lines)
+    return lines
+
+
+def pick_variant(family: str, locale: str = DEFAULT_LOCALE) -> int:
+    """Выбирает случайный вариант шаблона семейства"""
+    return random.randrange(len(_compiled[family][normalize_locale(locale)]))
+
+
+def render_caption(family: str, locale: str = DEFAULT_LOCALE, current: Optional[Dict[str, float]] = None,
+                   last: Optional[Dict[str, float]] = None, variant: Optional[int] = None,
+                   values: Optional[Dict[str, str]] = None) -> str:
+    """
+    Рендерит сообщение семейства family для локали.
+    values — остальные подстановки шаблона (уже отформатированные строки).
+    Подпись кэшируется по (семейство, локаль, вариант, снимок цен, values), поэтому рассылка
+    в тысячи групп или поток /price рендерят каждый вариант один раз.
+    """
+    locale = normalize_locale(locale)
+    if variant is None:
+        variant = pick_variant(family, locale)
+    snapshot = price_snapshot(current, last) if current is not None else None
+    extra = tuple(sorted(values.items())) if values else None
+    key = (family, locale, variant, snapshot, extra)
+
+    caption = _cache_get(_caption_cache, key)
+    if caption is None:
+        all_values = dict(values or {})
+        if current is not None:
+            all_values["currency_lines"] = render_currency_lines(current, last)
+        caption = _compiled[family][locale][variant].render(all_values)
+        _cache_put(_caption_cache, key, caption)
+    return caption